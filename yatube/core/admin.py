@@ -0,0 +1,147 @@
+import json
+
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from . import jobs
+from .models import Job, RequestProfile
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'created',
+        'method',
+        'path',
+        'view_name',
+        'status',
+        'duration_ms',
+        'query_count',
+        'reason',
+        'user',
+    )
+    list_filter = ('reason', 'view_name', 'created')
+    search_fields = ('path', 'view_name')
+    date_hierarchy = 'created'
+    fields = (
+        'created',
+        'method',
+        'path',
+        'view_name',
+        'status',
+        'reason',
+        'user',
+        'duration_ms',
+        'query_count',
+        'query_ms',
+        'download',
+        'sql',
+        'call_tree',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='core_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.stats), content_type='application/octet-stream'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile-{profile.pk}.prof"'
+        )
+        return response
+
+    def download(self, obj):
+        return format_html(
+            '<a href="{}">profile-{}.prof</a> (pstats, snakeviz)',
+            reverse('admin:core_requestprofile_download', args=(obj.pk,)),
+            obj.pk,
+        )
+    download.short_description = 'файл профиля'
+
+    def sql(self, obj):
+        rows = format_html_join(
+            '',
+            '<tr><td>{:.1f}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (query['ms'], query['source'] or '-',
+                 query['template'] or '-', query['sql'])
+                for query in json.loads(obj.queries)
+            ),
+        )
+        return format_html(
+            '<table><tr><th>мс</th><th>код</th><th>шаблон</th>'
+            '<th>SQL</th></tr>{}</table>',
+            rows,
+        )
+    sql.short_description = 'SQL-запросы'
+
+    def call_tree(self, obj):
+        return format_html('<pre>{}</pre>', obj.report)
+    call_tree.short_description = 'дерево вызовов'
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key', 'args')
+    actions = ('retry',)
+    readonly_fields = (
+        'name',
+        'args',
+        'key',
+        'status',
+        'attempts',
+        'max_attempts',
+        'run_at',
+        'locked_until',
+        'created',
+        'finished',
+        'error',
+    )
+    fields = readonly_fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def error(self, obj):
+        return format_html('<pre>{}</pre>', obj.last_error)
+    error.short_description = 'последняя ошибка'
+
+    def retry(self, request, queryset):
+        retried = jobs.retry(queryset)
+        self.message_user(request, f'Возвращено в очередь: {retried}')
+    retry.short_description = 'Повторить упавшие задачи'
+
+
+admin.site.register(Job, JobAdmin)
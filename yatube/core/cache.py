@@ -0,0 +1,287 @@
+"""Общий для всех процессов кэш в файле SQLite.
+
+В отличие от LocMemCache все воркеры gunicorn видят одни и те же
+записи, а объем файла ограничен MAX_SIZE: при превышении вытесняются
+давно не читавшиеся записи (LRU). get_or_set пересчитывает значение
+только в одном процессе, остальные в это время получают устаревшее
+значение, если оно еще хранится (STALE_TTL секунд после истечения).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, '
+    'value BLOB NOT NULL, '
+    'expires REAL, '
+    'stale_until REAL, '
+    'accessed REAL NOT NULL, '
+    'size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+LOCK_PREFIX = 'lock:'
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._stale_ttl = int(options.get('STALE_TTL', 60))
+        self._lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        self._lock_poll = float(options.get('LOCK_POLL', 0.05))
+        self._access_resolution = float(
+            options.get('ACCESS_RESOLUTION', 1)
+        )
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._writes = 0
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                db.execute(statement)
+            self._local.db = db
+            self._local.pid = pid
+        return self._local.db
+
+    @contextmanager
+    def _immediate(self):
+        """Транзакция с блокировкой записи; при ошибке откатывается."""
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _expiry(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return None, None
+        return expires, expires + self._stale_ttl
+
+    def _read(self, key):
+        """Возвращает (значение, свежее ли оно) или None."""
+        now = time.time()
+        row = self._db.execute(
+            'SELECT value, expires, stale_until, accessed FROM cache '
+            'WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, stale_until, accessed = row
+        if stale_until is not None and stale_until <= now:
+            return None
+        if now - accessed > self._access_resolution:
+            self._db.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key)
+            )
+        return pickle.loads(value), expires is None or expires > now
+
+    def _write(self, key, value, timeout, mode='REPLACE'):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires, stale_until = self._expiry(timeout)
+        cursor = self._db.execute(
+            f'INSERT OR {mode} INTO cache '
+            '(key, value, expires, stale_until, accessed, size) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (key, data, expires, stale_until, time.time(), len(data)),
+        )
+        self._writes += 1
+        if self._writes % self._cull_every == 0:
+            self._cull()
+        return cursor.rowcount > 0
+
+    def _cull(self):
+        now = time.time()
+        db = self._db
+        db.execute('DELETE FROM cache WHERE stale_until <= ?', (now,))
+        total, count = db.execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache'
+        ).fetchone()
+        if total <= self._max_size and count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            # CULL_FREQUENCY=0 у встроенных бэкендов очищает кэш целиком.
+            db.execute('DELETE FROM cache')
+            return
+        # Удаляем долю самых давно читавшихся записей, как CULL_FREQUENCY
+        # у встроенных бэкендов.
+        db.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (max(count // self._cull_frequency, 1),),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        result = self._read(key)
+        if result is None or not result[1]:
+            metrics.record_cache(misses=1)
+            return default
+        metrics.record_cache(hits=1)
+        return result[0]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._add(key, value, timeout)
+
+    def _add(self, key, value, timeout):
+        with self._immediate() as db:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            return self._write(key, value, timeout, mode='IGNORE')
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires, stale_until = self._expiry(timeout)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ?, stale_until = ? WHERE key = ?',
+            (expires, stale_until, key),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        result = self._read(key)
+        return result is not None and result[1]
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._immediate() as db:
+            result = self._read(key)
+            if result is None or not result[1]:
+                raise ValueError(f"Key '{key}' not found")
+            value = result[0] + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (data, len(data), key),
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        result = {}
+        touched = []
+        items = list(made.items())
+        now = time.time()
+        # SQLite ограничивает число параметров одного запроса.
+        for start in range(0, len(items), 500):
+            chunk = dict(items[start:start + 500])
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({placeholders})', list(chunk)
+            ).fetchall()
+            for key, value, expires, accessed in rows:
+                if expires is None or expires > now:
+                    result[chunk[key]] = pickle.loads(value)
+                    if now - accessed > self._access_resolution:
+                        touched.append(key)
+        # Как и get, чтение продлевает жизнь записи при вытеснении.
+        for start in range(0, len(touched), 500):
+            chunk = touched[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            self._db.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({placeholders})',
+                [now, *chunk],
+            )
+        metrics.record_cache(
+            hits=len(result), misses=len(made) - len(result)
+        )
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._immediate():
+            for key, value in data.items():
+                self.set(key, value, timeout, version=version)
+        return []
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        """get_or_set с защитой от stampede.
+
+        Значение пересчитывает только процесс, захвативший блокировку;
+        остальные получают устаревшее значение или ждут пересчета.
+        """
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        result = self._read(made_key)
+        if result is not None and result[1]:
+            metrics.record_cache(hits=1)
+            return result[0]
+        metrics.record_cache(misses=1)
+        lock = self.make_key(LOCK_PREFIX + key, version=version)
+        deadline = time.monotonic() + self._lock_timeout
+        locked = self._add(lock, True, self._lock_timeout)
+        while not locked:
+            if result is not None:
+                return result[0]
+            if time.monotonic() > deadline:
+                # Владелец блокировки завис: считаем сами, но чужую
+                # блокировку не снимаем.
+                break
+            time.sleep(self._lock_poll)
+            result = self._read(made_key)
+            if result is not None and result[1]:
+                return result[0]
+            locked = self._add(lock, True, self._lock_timeout)
+        try:
+            value = default() if callable(default) else default
+            if value is not None:
+                self._write(made_key, value, timeout)
+            return value
+        finally:
+            if locked:
+                self._db.execute('DELETE FROM cache WHERE key = ?', (lock,))
+
+    def close(self, **kwargs):
+        # Соединение живет до конца потока: открывать файл на каждый
+        # запрос дороже, чем держать его.
+        pass
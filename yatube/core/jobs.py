@@ -0,0 +1,164 @@
+"""Фоновые задачи в таблице Job, без брокера.
+
+Обработчик запроса только вызывает enqueue(), и задача не теряется при
+перезапуске процесса. ATOMIC_REQUESTS не включен: чтобы строка Job
+появилась только вместе с данными, обработчик сам оборачивает запись
+данных и enqueue() в transaction.atomic().
+Команда run_jobs забирает готовые задачи и выполняет их в пуле
+процессов. Упавшая задача повторяется с экспоненциальной задержкой,
+а после max_attempts попыток остается в статусе failed. Ожидающие
+и упавшие задачи видны в админке и в run_jobs --status.
+
+Задача - функция модуля с декоратором @job. В очередь пишется ее путь,
+и воркер выполняет только функции с этим декоратором.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+# Задача, которую воркер не завершил за это время (например, процесс
+# убит), снова становится доступной.
+LOCK_TIMEOUT = timedelta(minutes=10)
+KEEP_DONE = timedelta(days=1)
+
+logger = logging.getLogger(__name__)
+
+
+class NotAJob(Exception):
+    pass
+
+
+def job(func):
+    func.job_name = f'{func.__module__}.{func.__qualname__}'
+    return func
+
+
+def enqueue(func, *args, key=None, delay=0, max_attempts=MAX_ATTEMPTS):
+    """Ставит func(*args) в очередь и возвращает Job.
+
+    Если задача с тем же key еще ждет или выполняется, новая не
+    создается и возвращается None.
+    """
+    if not hasattr(func, 'job_name'):
+        raise NotAJob(f'{func!r} не помечена декоратором @job')
+    # Дубликат отсекает частичный уникальный индекс по key.
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=func.job_name,
+                args=json.dumps(args, ensure_ascii=False),
+                key=key,
+                max_attempts=max_attempts,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        return None
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(
+        BACKOFF_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS
+    ))
+
+
+def _ready(now):
+    return (
+        Q(status=Job.PENDING, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(limit):
+    """Занимает до limit готовых задач и возвращает их id.
+
+    Задача занимается отдельным UPDATE с тем же условием, поэтому два
+    воркера не получат одну задачу.
+    """
+    now = timezone.now()
+    candidates = list(
+        Job.objects
+        .filter(_ready(now))
+        .order_by('run_at', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in candidates:
+        if Job.objects.filter(_ready(now), pk=pk).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + LOCK_TIMEOUT,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def _finish(job, **fields):
+    # Задачу, которая выполнялась дольше LOCK_TIMEOUT, мог занять другой
+    # воркер: ее результат не перезаписываем.
+    if not Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_until=job.locked_until
+    ).update(locked_until=None, **fields):
+        logger.warning(
+            'Задачу %s #%d занял другой воркер, результат не записан',
+            job.name, job.pk,
+        )
+
+
+def run(pk):
+    """Выполняет занятую задачу и записывает результат."""
+    job = Job.objects.get(pk=pk)
+    try:
+        func = import_string(job.name)
+        if getattr(func, 'job_name', None) != job.name:
+            raise NotAJob(f'{job.name} не помечена декоратором @job')
+        func(*json.loads(job.args))
+    except Exception:
+        logger.exception('Задача %s #%d упала', job.name, pk)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            fields = {'status': Job.FAILED, 'finished': now}
+        else:
+            fields = {
+                'status': Job.PENDING,
+                'run_at': now + backoff(job.attempts),
+            }
+        _finish(job, last_error=traceback.format_exc(), **fields)
+        return False
+    _finish(job, status=Job.DONE, finished=timezone.now())
+    return True
+
+
+def retry(jobs):
+    """Возвращает упавшие задачи в очередь; возвращает их число."""
+    retried = 0
+    for pk in jobs.filter(status=Job.FAILED).values_list('pk', flat=True):
+        try:
+            with transaction.atomic():
+                retried += Job.objects.filter(pk=pk).update(
+                    status=Job.PENDING,
+                    attempts=0,
+                    run_at=timezone.now(),
+                    finished=None,
+                )
+        except IntegrityError:
+            # В очереди уже есть такая же задача.
+            pass
+    return retried
+
+
+def prune():
+    """Удаляет давно выполненные задачи."""
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=timezone.now() - KEEP_DONE
+    ).delete()[0]
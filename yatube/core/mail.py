@@ -0,0 +1,74 @@
+"""Отправка почты через очередь фоновых задач.
+
+QueuedEmailBackend ставит каждое письмо отдельной задачей deliver,
+которая отправляет его бэкендом QUEUED_EMAIL_BACKEND. Если отправка
+упала на середине пачки, повторяются только неотправленные письма,
+а не вся пачка. Ключ задачи - хэш письма, поэтому повторный вызов
+send_messages с тем же письмом, пока оно ждет в очереди, не ставит
+дубликат. Письма с вложениями отправляются сразу: вложения
+не сериализуются в JSON.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .jobs import enqueue, job
+
+MESSAGE_FIELDS = (
+    'subject',
+    'body',
+    'from_email',
+    'to',
+    'cc',
+    'bcc',
+    'reply_to',
+    'extra_headers',
+)
+
+
+def _delivery_connection():
+    return get_connection(settings.QUEUED_EMAIL_BACKEND)
+
+
+def _message(fields):
+    headers = fields.pop('extra_headers')
+    alternatives = [tuple(item) for item in fields.pop('alternatives')]
+    return EmailMultiAlternatives(
+        headers=headers, alternatives=alternatives, **fields
+    )
+
+
+def _key(fields):
+    raw = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return f'mail:{hashlib.sha256(raw.encode()).hexdigest()}'
+
+
+@job
+def deliver(messages):
+    # Список, а не одно письмо: так задачи, поставленные до перехода
+    # на задачу на письмо, выполняются без изменений.
+    _delivery_connection().send_messages(
+        [_message(fields) for fields in messages]
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        immediate, queued = [], []
+        for message in email_messages:
+            if message.attachments:
+                immediate.append(message)
+                continue
+            fields = {
+                name: getattr(message, name) for name in MESSAGE_FIELDS
+            }
+            fields['alternatives'] = getattr(message, 'alternatives', [])
+            queued.append(fields)
+        for fields in queued:
+            enqueue(deliver, [fields], key=_key(fields))
+        if immediate:
+            _delivery_connection().send_messages(immediate)
+        return len(email_messages)
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+
+from core import jobs
+from core.models import Job
+
+FAILED_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди Job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Число процессов; 1 - выполнять в текущем процессе.',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=0,
+            help='Сколько задач занимать за раз; по умолчанию 4 на процесс.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Показать состояние очереди и упавшие задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            return self.show_status()
+        workers = options['workers']
+        batch = options['batch'] or workers * 4
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        done = failed = 0
+        try:
+            while True:
+                claimed = jobs.claim(batch)
+                if claimed:
+                    if pool is not None:
+                        # Дочерние процессы не должны делить соединения
+                        # с родителем.
+                        connections.close_all()
+                        results = list(pool.map(jobs.run, claimed))
+                    else:
+                        results = [jobs.run(pk) for pk in claimed]
+                    done += results.count(True)
+                    failed += results.count(False)
+                    continue
+                jobs.prune()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}')
+
+    def show_status(self):
+        counts = dict(
+            Job.objects
+            .order_by()
+            .values_list('status')
+            .annotate(total=Count('pk'))
+        )
+        for status, title in Job.STATUSES:
+            self.stdout.write(f'{title}: {counts.get(status, 0)}')
+        failed = Job.objects.filter(status=Job.FAILED)[:FAILED_SHOWN]
+        for job in failed:
+            error = job.last_error.strip().splitlines()
+            self.stdout.write(
+                f'#{job.pk} {job.name} {job.args}: '
+                f'{error[-1] if error else ""}'
+            )
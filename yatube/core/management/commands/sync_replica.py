@@ -0,0 +1,48 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.replicas import PRIMARY, REPLICA, replica_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файл реплики. С --interval '
+        'повторяет копирование, изображая реплику с задержкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Пауза между копиями в секундах; 0 - скопировать один раз.',
+        )
+
+    def handle(self, *args, **options):
+        primary, replica = connections[PRIMARY], connections[REPLICA]
+        if (primary.vendor != 'sqlite' or replica.vendor != 'sqlite'
+                or not replica_enabled()):
+            raise CommandError(
+                'Нужны две SQLite-базы: задайте YATUBE_REPLICA_PATH.'
+            )
+        path = replica.settings_dict['NAME']
+        while True:
+            self.sync(primary, path)
+            self.stdout.write(f'Реплика {path} обновлена')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, primary, path):
+        # Копирование идет прямо в файл реплики: открытые соединения
+        # увидят новые данные, а читатели на время копирования ждут
+        # блокировку и не видят базу наполовину скопированной.
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
@@ -0,0 +1,286 @@
+"""Метрики запросов в формате Prometheus.
+
+Каждый процесс копит счетчики в памяти и раз в METRICS_FLUSH_INTERVAL
+секунд атомарно сбрасывает снимок в METRICS_DIR/<pid>.json. Endpoint
+/metrics складывает снимки всех воркеров, поэтому на запрос тратится
+лишь несколько вызовов perf_counter и обновление словаря. Снимки
+завершившихся процессов переносятся в RETIRED: счетчики не убывают,
+а каталог не растет с каждым перезапуском воркеров.
+"""
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNRESOLVED = '<unresolved>'
+COUNTERS = (
+    ('db_queries_total', 'SQL-запросы.'),
+    ('db_query_seconds_total', 'Время SQL-запросов.'),
+    ('template_render_seconds_total', 'Время рендеринга шаблонов.'),
+    ('cache_hits_total', 'Попадания в кэш.'),
+    ('cache_misses_total', 'Промахи кэша.'),
+)
+PREFIX = 'yatube_'
+RETIRED = 'retired.json'
+RETIRE_LOCK = '.retire.lock'
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def _empty():
+    return {
+        'buckets': [0] * len(BUCKETS),
+        'sum': 0.0,
+        'count': 0,
+        'statuses': defaultdict(int),
+        **{name: 0 for name, _ in COUNTERS},
+    }
+
+
+_views = defaultdict(_empty)
+_flushed = 0.0
+
+
+class RequestMetrics:
+    __slots__ = ('render_depth',) + tuple(name for name, _ in COUNTERS)
+
+    def __init__(self):
+        self.render_depth = 0
+        for name, _ in COUNTERS:
+            setattr(self, name, 0)
+
+
+def current():
+    return getattr(_local, 'request', None)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    request = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if request is not None:
+            request.db_queries_total += 1
+            request.db_query_seconds_total += (
+                time.perf_counter() - started
+            )
+
+
+def record_cache(hits=0, misses=0):
+    request = current()
+    if request is not None:
+        request.cache_hits_total += hits
+        request.cache_misses_total += misses
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        request = current()
+        if request is None or request.render_depth:
+            return render(self, *args, **kwargs)
+        # Вложенные render_to_string уже входят во внешний рендер.
+        request.render_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            request.render_depth -= 1
+            request.template_render_seconds_total += (
+                time.perf_counter() - started
+            )
+    wrapper.timed = True
+    return wrapper
+
+
+def install():
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+def observe(view, status, duration, request):
+    with _lock:
+        data = _views[view]
+        for index, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                data['buckets'][index] += 1
+        data['sum'] += duration
+        data['count'] += 1
+        data['statuses'][str(status)] += 1
+        for name, _ in COUNTERS:
+            data[name] += getattr(request, name)
+    if time.monotonic() - _flushed > settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def _write(path, snapshot):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as tmp:
+        tmp.write(snapshot)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    try:
+        with open(path) as snapshot:
+            return json.load(snapshot)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(total, views):
+    for view, data in views.items():
+        merged = total.setdefault(view, _empty())
+        merged['buckets'] = [
+            a + b for a, b in zip(merged['buckets'], data['buckets'])
+        ]
+        for key in ('sum', 'count', *(name for name, _ in COUNTERS)):
+            merged[key] += data[key]
+        for status, count in data['statuses'].items():
+            merged['statuses'][status] += count
+    return total
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def flush():
+    global _flushed
+    with _lock:
+        snapshot = json.dumps(_views)
+        _flushed = time.monotonic()
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _write(
+        os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json'), snapshot
+    )
+
+
+def retire():
+    """Переносит снимки завершившихся процессов в RETIRED."""
+    directory = settings.METRICS_DIR
+    dead = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        pid = os.path.basename(path)[:-len('.json')]
+        if pid.isdigit() and not _alive(int(pid)):
+            dead.append(path)
+    if not dead:
+        return
+    retired_path = os.path.join(directory, RETIRED)
+    with open(os.path.join(directory, RETIRE_LOCK), 'w') as lock:
+        # Один снимок не должен попасть в RETIRED дважды.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        total = _merge({}, _load(retired_path) or {})
+        retired = []
+        for path in dead:
+            views = _load(path)
+            if views is not None:
+                _merge(total, views)
+                retired.append(path)
+        if retired:
+            _write(retired_path, json.dumps(total))
+            for path in retired:
+                os.remove(path)
+
+
+def collect():
+    """Складывает снимки всех процессов, включая завершившиеся."""
+    flush()
+    retire()
+    total = {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        views = _load(path)
+        if views is not None:
+            _merge(total, views)
+    return total
+
+
+def _label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"')
+
+
+def exposition():
+    views = sorted(collect().items())
+    lines = [
+        f'# HELP {PREFIX}request_duration_seconds Время ответа view.',
+        f'# TYPE {PREFIX}request_duration_seconds histogram',
+    ]
+    for view, data in views:
+        label = f'view="{_label(view)}"'
+        for bound, count in zip(BUCKETS, data['buckets']):
+            lines.append(
+                f'{PREFIX}request_duration_seconds_bucket'
+                f'{{{label},le="{bound}"}} {count}'
+            )
+        lines += [
+            f'{PREFIX}request_duration_seconds_bucket'
+            f'{{{label},le="+Inf"}} {data["count"]}',
+            f'{PREFIX}request_duration_seconds_sum{{{label}}} {data["sum"]}',
+            f'{PREFIX}request_duration_seconds_count{{{label}}} '
+            f'{data["count"]}',
+        ]
+    lines += [
+        f'# HELP {PREFIX}requests_total Ответы по кодам статуса.',
+        f'# TYPE {PREFIX}requests_total counter',
+    ]
+    for view, data in views:
+        for status, count in sorted(data['statuses'].items()):
+            lines.append(
+                f'{PREFIX}requests_total'
+                f'{{view="{_label(view)}",status="{status}"}} {count}'
+            )
+    for name, description in COUNTERS:
+        lines += [
+            f'# HELP {PREFIX}{name} {description}',
+            f'# TYPE {PREFIX}{name} counter',
+        ]
+        for view, data in views:
+            lines.append(
+                f'{PREFIX}{name}{{view="{_label(view)}"}} {data[name]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        _local.request = metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.request = None
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED
+        if view != 'metrics':
+            observe(
+                view,
+                response.status_code,
+                time.perf_counter() - started,
+                metrics,
+            )
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='дата')),
+                ('method', models.CharField(max_length=10, verbose_name='метод')),
+                ('path', models.CharField(max_length=500, verbose_name='адрес')),
+                ('view_name', models.CharField(blank=True, db_index=True, max_length=200, verbose_name='view')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='статус')),
+                ('reason', models.CharField(choices=[('flag', 'по запросу'), ('sample', 'выборка')], max_length=10, verbose_name='причина')),
+                ('duration_ms', models.FloatField(verbose_name='время, мс')),
+                ('query_count', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('query_ms', models.FloatField(verbose_name='время SQL, мс')),
+                ('report', models.TextField(verbose_name='дерево вызовов')),
+                ('queries', models.TextField(verbose_name='SQL-запросы (JSON)')),
+                ('stats', models.BinaryField(verbose_name='статистика pstats')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'профиль запроса',
+                'verbose_name_plural': 'профили запросов',
+                'ordering': ('-created', '-id'),
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='задача')),
+                ('args', models.TextField(default='[]', verbose_name='аргументы (JSON)')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, verbose_name='ключ дедупликации')),
+                ('status', models.CharField(choices=[('pending', 'ожидает'), ('running', 'выполняется'), ('done', 'выполнена'), ('failed', 'не выполнена')], default='pending', max_length=10, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(verbose_name='наибольшее число попыток')),
+                ('run_at', models.DateTimeField(verbose_name='запуск не раньше')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='занята воркером до')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='создана')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='завершена')),
+            ],
+            options={
+                'verbose_name': 'фоновая задача',
+                'verbose_name_plural': 'фоновые задачи',
+                'ordering': ('-created', '-id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_at'], name='core_job_status_run_at'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(status__in=('pending', 'running')), fields=('key',), name='core_job_active_key'),
+        ),
+    ]
@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class RequestProfile(models.Model):
+    FLAG = 'flag'
+    SAMPLE = 'sample'
+    REASONS = (
+        (FLAG, 'по запросу'),
+        (SAMPLE, 'выборка'),
+    )
+
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='дата',
+    )
+    method = models.CharField(max_length=10, verbose_name='метод')
+    path = models.CharField(max_length=500, verbose_name='адрес')
+    view_name = models.CharField(
+        max_length=200,
+        blank=True,
+        db_index=True,
+        verbose_name='view',
+    )
+    status = models.PositiveSmallIntegerField(verbose_name='статус')
+    reason = models.CharField(
+        max_length=10,
+        choices=REASONS,
+        verbose_name='причина',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='пользователь',
+    )
+    duration_ms = models.FloatField(verbose_name='время, мс')
+    query_count = models.PositiveIntegerField(verbose_name='SQL-запросов')
+    query_ms = models.FloatField(verbose_name='время SQL, мс')
+    report = models.TextField(verbose_name='дерево вызовов')
+    queries = models.TextField(verbose_name='SQL-запросы (JSON)')
+    stats = models.BinaryField(verbose_name='статистика pstats')
+
+    class Meta:
+        verbose_name = 'профиль запроса'
+        verbose_name_plural = 'профили запросов'
+        ordering = ('-created', '-id')
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} мс)'
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'ожидает'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнена'),
+        (FAILED, 'не выполнена'),
+    )
+    ACTIVE = (PENDING, RUNNING)
+
+    name = models.CharField(max_length=200, verbose_name='задача')
+    args = models.TextField(default='[]', verbose_name='аргументы (JSON)')
+    key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        verbose_name='ключ дедупликации',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='попыток',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='наибольшее число попыток',
+    )
+    run_at = models.DateTimeField(verbose_name='запуск не раньше')
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='занята воркером до',
+    )
+    last_error = models.TextField(blank=True, verbose_name='последняя ошибка')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='создана')
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='завершена',
+    )
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'фоновые задачи'
+        ordering = ('-created', '-id')
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'),
+                name='core_job_status_run_at',
+            ),
+        )
+        constraints = (
+            # Одинаковая задача не ставится в очередь, пока прежняя
+            # не выполнена.
+            models.UniqueConstraint(
+                fields=('key',),
+                condition=models.Q(status__in=('pending', 'running')),
+                name='core_job_active_key',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,153 @@
+"""Профилирование отдельных запросов в production.
+
+Сотрудник включает профилировщик заголовком X-Profile или параметром
+?_profile=1, кроме того, доля PROFILER_SAMPLE_RATE всех запросов
+профилируется случайно. Запрос выполняется под cProfile, а каждый
+SQL-запрос записывается с местом в коде проекта и шаблоном, при
+рендеринге которого он выполнен. Профиль сохраняется в RequestProfile
+по сигналу request_finished, то есть уже после ответа: запись не
+попадает в сам профиль, бюджеты запросов и закрепление за основной
+базой. Профили смотрят и скачивают в админке.
+"""
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.utils import CursorWrapper
+from django.template.base import Template
+
+from .models import RequestProfile
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+REPORT_LINES = 60
+KEEP_PROFILES = 1000
+
+PROJECT_DIR = settings.BASE_DIR + os.sep
+
+_RENDER_CODE = Template._render.__code__
+_EXECUTE_CODE = CursorWrapper._execute_with_wrappers.__code__
+_local = threading.local()
+
+
+def _where():
+    """Место в коде проекта и шаблон, из которых выполнен запрос."""
+    frame = sys._getframe(1)
+    # Обертки execute_wrapper (в том числе метрики и бюджеты) вызываются
+    # из CursorWrapper._execute_with_wrappers, код проекта выше нее.
+    while frame is not None and frame.f_code is not _EXECUTE_CODE:
+        frame = frame.f_back
+    source = template = None
+    while frame is not None and (source is None or template is None):
+        code = frame.f_code
+        if template is None and code is _RENDER_CODE:
+            origin = frame.f_locals['self'].origin
+            template = origin.template_name or origin.name
+        elif source is None and code.co_filename.startswith(PROJECT_DIR):
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            source = f'{path}:{frame.f_lineno} {code.co_name}'
+        frame = frame.f_back
+    return source, template
+
+
+class SQLRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            source, template = _where()
+            self.queries.append({
+                'sql': sql,
+                'ms': (time.perf_counter() - started) * 1000,
+                'source': source,
+                'template': template,
+            })
+
+
+def reason(request):
+    if request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return RequestProfile.FLAG
+    rate = settings.PROFILER_SAMPLE_RATE
+    if rate and random.random() < rate:
+        return RequestProfile.SAMPLE
+    return None
+
+
+def report(profiler):
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+    # Кто кого вызывает в коде проекта, включая шаблонные теги.
+    stats.print_callees(re.escape(settings.BASE_DIR), REPORT_LINES)
+    return output.getvalue()
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        why = reason(request)
+        if why is None:
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        recorder = SQLRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        user = getattr(request, 'user', None)
+        _local.pending = profiler, {
+            'method': request.method,
+            'path': request.get_full_path()[:500],
+            'view_name': match.view_name if match else '',
+            'status': response.status_code,
+            'reason': why,
+            'user_id': user.pk if user is not None else None,
+            'duration_ms': duration,
+            'query_count': len(recorder.queries),
+            'query_ms': sum(query['ms'] for query in recorder.queries),
+            'queries': json.dumps(recorder.queries, ensure_ascii=False),
+        }
+        return response
+
+
+def store_pending():
+    """Сохраняет профиль запроса, завершенного в этом потоке."""
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        return None
+    _local.pending = None
+    profiler, fields = pending
+    profiler.create_stats()
+    profile = RequestProfile.objects.create(
+        report=report(profiler),
+        stats=marshal.dumps(profiler.stats),
+        **fields,
+    )
+    RequestProfile.objects.filter(pk__lte=profile.pk - KEEP_PROFILES).delete()
+    return profile
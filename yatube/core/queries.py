@@ -0,0 +1,121 @@
+"""Поиск N+1 и бюджеты SQL-запросов на страницу.
+
+QueryInspectorMiddleware собирает отпечатки запросов: SQL без
+параметров, со свернутыми списками IN. Отпечаток, выполненный за
+запрос N_PLUS_ONE_THRESHOLD и более раз, почти всегда означает ленивую
+загрузку связи в цикле и попадает в лог. Если для имени URL объявлен
+бюджет в QUERY_BUDGETS, а QUERY_BUDGETS_ENFORCED включен (его включает
+тестовый раннер), превышение бюджета завершает запрос исключением
+и роняет тест.
+"""
+import logging
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+N_PLUS_ONE_THRESHOLD = 3
+SKIPPED_STATEMENTS = ('SAVEPOINT', 'RELEASE', 'ROLLBACK')
+# Хранилище sorl-thumbnail читается только при промахе кэша, и число
+# запросов зависит от числа картинок на странице, а не от кода view.
+SKIPPED_TABLES = ('"thumbnail_kvstore"',)
+
+IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)')
+SPACES = re.compile(r'\s+')
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    return IN_LIST.sub('IN (...)', SPACES.sub(' ', sql.strip()))
+
+
+class QueryLog:
+    def __init__(self):
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not (sql.lstrip().upper().startswith(SKIPPED_STATEMENTS)
+                or any(table in sql for table in SKIPPED_TABLES)):
+            self.fingerprints[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.fingerprints.values())
+
+    def repeated(self):
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+
+class QueryInspectorMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        repeated = log.repeated()
+        for sql, count in repeated:
+            logger.warning(
+                'Возможный N+1 в %s: %d раз %s', view, count, sql
+            )
+        budget = settings.QUERY_BUDGETS.get(view)
+        if (settings.QUERY_BUDGETS_ENFORCED and budget is not None
+                and log.total > budget):
+            details = ''.join(
+                f'\n  {count} x {sql}'
+                for sql, count in log.fingerprints.most_common()
+            )
+            raise QueryBudgetExceeded(
+                f'{view}: {log.total} SQL-запросов при бюджете {budget}'
+                f'{details}'
+            )
+        return response
+
+
+class QueryBudgetRunner(DiscoverRunner):
+    """Тестовый раннер, в котором бюджеты запросов обязательны.
+
+    Кэш тестов лежит во временном каталоге: cache.clear() в тестах
+    не должен стирать кэш запущенного рядом dev-сервера.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGETS_ENFORCED = True
+        self.cache_directory = tempfile.mkdtemp(prefix='yatube-cache-')
+        self.cache_settings = override_settings(CACHES={
+            alias: {
+                **options,
+                'LOCATION': os.path.join(
+                    self.cache_directory, f'{alias}.sqlite3'
+                ),
+            }
+            for alias, options in settings.CACHES.items()
+        })
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,92 @@
+"""Чтение с реплики базы для запросов, которые ничего не пишут.
+
+ReplicaMiddleware разрешает роутеру читать с REPLICA только внутри
+безопасного HTTP-запроса. Первая запись в запросе переключает оставшиеся
+чтения на основную базу, а ответ получает cookie PIN_COOKIE: следующие
+REPLICA_PIN_SECONDS секунд все запросы пользователя читают с основной
+базы и видят свои изменения, даже если реплика отстает. Вне запросов
+(команды, фоновые потоки) чтение всегда идет с основной базы.
+
+Реплика, совпадающая с основной базой (по умолчанию локально и в тестах,
+где она зеркало default), не используется: второе соединение к тому же
+файлу ничего не дает.
+"""
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+REPLICA = 'replica'
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_local = threading.local()
+
+
+def replica_enabled():
+    if REPLICA not in connections.databases:
+        return False
+    return (
+        connections[REPLICA].settings_dict['NAME']
+        != connections[PRIMARY].settings_dict['NAME']
+    )
+
+
+def pin():
+    """Направляет оставшиеся чтения запроса на основную базу."""
+    _local.use_replica = False
+    _local.wrote = True
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    # db_for_write вызывается и без записи, например при присваивании
+    # внешнего ключа, поэтому запись распознается по самому запросу.
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        pin()
+    return execute(sql, params, many, context)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_local, 'use_replica', False) and replica_enabled():
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему копированием основной базы.
+        return db == PRIMARY
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.use_replica = (
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+        _local.wrote = request.method not in SAFE_METHODS
+        try:
+            with connections[PRIMARY].execute_wrapper(_execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            wrote = _local.wrote
+            _local.use_replica = _local.wrote = False
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_cache_is_shared_between_instances(self):
+        """Запись видна другому экземпляру, открывшему тот же файл."""
+        self.make_cache().set('key', {'value': 1})
+        other = self.make_cache()
+        self.assertEqual(other.get('key'), {'value': 1})
+        other.set('counter', 1)
+        self.assertEqual(self.make_cache().incr('counter', 2), 3)
+        self.assertFalse(other.add('counter', 10))
+        other.clear()
+        self.assertIsNone(self.make_cache().get('key'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """При превышении MAX_SIZE вытесняются давно не читавшиеся."""
+        cache = self.make_cache(
+            MAX_SIZE=2000, CULL_EVERY=1, CULL_FREQUENCY=2,
+            ACCESS_RESOLUTION=0,
+        )
+        cache.set('hot', 'x' * 500)
+        for index in range(3):
+            cache.set(f'cold_{index}', 'x' * 500)
+            cache.get('hot')
+        cache.set('new', 'x' * 500)
+        self.assertIsNotNone(cache.get('hot'))
+        self.assertIsNotNone(cache.get('new'))
+        self.assertIsNone(cache.get('cold_0'))
+
+    def test_zero_cull_frequency_clears_cache(self):
+        """CULL_FREQUENCY=0, как у встроенных бэкендов, очищает кэш."""
+        cache = self.make_cache(
+            MAX_ENTRIES=2, CULL_EVERY=1, CULL_FREQUENCY=0
+        )
+        for index in range(3):
+            cache.set(f'key_{index}', index)
+        self.assertEqual(cache.get_many(['key_0', 'key_1', 'key_2']), {})
+
+    def test_get_many_keeps_entries_hot(self):
+        """Чтение через get_many тоже защищает запись от вытеснения."""
+        cache = self.make_cache(
+            MAX_SIZE=2000, CULL_EVERY=1, CULL_FREQUENCY=2,
+            ACCESS_RESOLUTION=0,
+        )
+        cache.set('hot', 'x' * 500)
+        for index in range(3):
+            cache.set(f'cold_{index}', 'x' * 500)
+            cache.get_many(['hot', 'missing'])
+        cache.set('new', 'x' * 500)
+        self.assertIsNotNone(cache.get('hot'))
+        self.assertIsNone(cache.get('cold_0'))
+
+    def test_failed_batch_write_is_rolled_back(self):
+        """set_many, упавший на середине, не оставляет части записей."""
+        cache = self.make_cache()
+        with self.assertRaises(Exception):
+            cache.set_many({'first': 1, 'broken': threading.Lock()})
+        self.assertIsNone(cache.get('first'))
+        cache.set('counter', 'text')
+        with self.assertRaises(TypeError):
+            cache.incr('counter')
+        self.assertTrue(cache.add('other', 1))
+        self.assertEqual(cache.get('counter'), 'text')
+
+    def test_stale_value_is_served_while_recomputed(self):
+        """Пока значение пересчитывается, другим отдается устаревшее."""
+        cache = self.make_cache(STALE_TTL=60)
+        cache.set('key', 'old', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('key'))
+        self.assertTrue(cache.add('lock:key', True, 10))
+        self.assertEqual(cache.get_or_set('key', lambda: 'new'), 'old')
+        cache.delete('lock:key')
+        self.assertEqual(cache.get_or_set('key', lambda: 'new'), 'new')
+        self.assertEqual(cache.get('key'), 'new')
+
+    def test_lock_of_other_process_survives_timeout(self):
+        """После таймаута ожидания чужая блокировка не снимается."""
+        cache = self.make_cache(LOCK_TIMEOUT=0.05, LOCK_POLL=0.01)
+        self.assertTrue(cache.add('lock:key', True, 60))
+        self.assertEqual(cache.get_or_set('key', lambda: 'new'), 'new')
+        self.assertTrue(cache.get('lock:key'))
+
+    def test_hot_key_is_computed_once(self):
+        """Одновременные промахи по ключу вычисляют значение один раз."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+
+        def worker():
+            results.append(
+                self.make_cache(LOCK_POLL=0.01).get_or_set('key', compute)
+            )
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
@@ -0,0 +1,185 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import jobs
+from ..models import Job
+
+User = get_user_model()
+CALLS = []
+
+
+@jobs.job
+def remember(value):
+    CALLS.append(value)
+
+
+@jobs.job
+def explode():
+    raise ValueError('Сломалось')
+
+
+@jobs.job
+def overrun():
+    # Пока задача выполнялась, ее занял другой воркер.
+    Job.objects.filter(name=overrun.job_name).update(
+        locked_until=timezone.now() + 2 * jobs.LOCK_TIMEOUT
+    )
+
+
+def not_a_job():
+    pass
+
+
+def run_jobs():
+    out = StringIO()
+    call_command('run_jobs', workers=1, once=True, stdout=out)
+    return out.getvalue()
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_job_runs_once(self):
+        jobs.enqueue(remember, 'значение')
+        self.assertEqual(CALLS, [])
+        self.assertIn('Выполнено задач: 1, с ошибкой: 0', run_jobs())
+        self.assertEqual(CALLS, ['значение'])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        run_jobs()
+        self.assertEqual(CALLS, ['значение'])
+
+    def test_key_deduplicates_active_jobs(self):
+        self.assertIsNotNone(jobs.enqueue(remember, 1, key='one'))
+        self.assertIsNone(jobs.enqueue(remember, 2, key='one'))
+        run_jobs()
+        self.assertIsNotNone(jobs.enqueue(remember, 3, key='one'))
+        run_jobs()
+        self.assertEqual(CALLS, [1, 3])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue(explode, max_attempts=2)
+        self.assertIn('с ошибкой: 1', run_jobs())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Сломалось', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        # До истечения задержки задача не берется.
+        self.assertIn('Выполнено задач: 0, с ошибкой: 0', run_jobs())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        status = StringIO()
+        call_command('run_jobs', status=True, stdout=status)
+        self.assertIn('не выполнена: 1', status.getvalue())
+        self.assertIn(f'#{job.pk} {job.name}', status.getvalue())
+
+        self.assertEqual(jobs.retry(Job.objects.all()), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 0))
+
+    def test_backoff_grows_exponentially(self):
+        self.assertEqual(
+            [jobs.backoff(attempt).total_seconds() for attempt in (1, 2, 3)],
+            [10, 20, 40],
+        )
+        self.assertEqual(
+            jobs.backoff(100).total_seconds(), jobs.BACKOFF_MAX_SECONDS
+        )
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = jobs.enqueue(remember, 'после сбоя')
+        self.assertEqual(jobs.claim(10), [job.pk])
+        self.assertEqual(jobs.claim(10), [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        run_jobs()
+        self.assertEqual(CALLS, ['после сбоя'])
+
+    def test_reclaimed_job_result_is_not_overwritten(self):
+        job = jobs.enqueue(overrun)
+        self.assertEqual(jobs.claim(10), [job.pk])
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertTrue(jobs.run(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertIsNotNone(job.locked_until)
+
+    def test_only_marked_functions_are_queued(self):
+        with self.assertRaises(jobs.NotAJob):
+            jobs.enqueue(not_a_job)
+        Job.objects.create(
+            name='os.system',
+            args='["true"]',
+            max_attempts=1,
+            run_at=timezone.now(),
+        )
+        run_jobs()
+        self.assertIn('NotAJob', Job.objects.get().last_error)
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_password_reset_email_is_sent_by_worker(self):
+        User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'reader@example.com'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.get().name, 'core.mail.deliver')
+        run_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertIn('reset', mail.outbox[0].body)
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_failed_delivery_retries_only_unsent_messages(self):
+        messages = [
+            mail.EmailMessage('Тема', 'Текст', to=[address])
+            for address in ('first@example.com', 'second@example.com')
+        ]
+        mail.get_connection().send_messages(messages)
+        self.assertEqual(Job.objects.count(), 2)
+        # Тот же вызов, пока письма ждут в очереди, дубликатов не ставит.
+        mail.get_connection().send_messages(messages)
+        self.assertEqual(Job.objects.count(), 2)
+
+        send_messages = locmem.EmailBackend.send_messages
+
+        def fail_second(backend, messages):
+            if messages[0].to == ['second@example.com']:
+                raise ConnectionError('Почта недоступна')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(
+            locmem.EmailBackend, 'send_messages', fail_second
+        ):
+            self.assertIn('с ошибкой: 1', run_jobs())
+        Job.objects.update(run_at=timezone.now())
+        run_jobs()
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['first@example.com'], ['second@example.com']],
+        )
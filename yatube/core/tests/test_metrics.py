@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+class MetricsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def sample(self, text, name, view):
+        prefix = f'{metrics.PREFIX}{name}{{view="{view}"}} '
+        for line in text.splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix):])
+        return 0
+
+    def test_metrics_are_recorded_per_view(self):
+        """Запросы к view видны на /metrics с числом SQL-запросов."""
+        before = self.client.get(reverse('metrics')).content.decode()
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        for name in ('request_duration_seconds_count', 'db_queries_total'):
+            self.assertGreater(
+                self.sample(text, name, 'posts:index'),
+                self.sample(before, name, 'posts:index'),
+            )
+        self.assertGreater(
+            self.sample(text, 'template_render_seconds_total', 'posts:index'),
+            0,
+        )
+        self.assertEqual(self.sample(text, 'db_queries_total', 'metrics'), 0)
+
+    def test_metrics_of_other_workers_are_summed(self):
+        """Снимки других процессов складываются с собственными."""
+        snapshot = metrics._empty()
+        snapshot.update(count=5, sum=1.0, db_queries_total=7)
+        with open(os.path.join(TEMP_METRICS_DIR, '0.json'), 'w') as other:
+            json.dump({'about:author': snapshot}, other)
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertEqual(
+            self.sample(text, 'db_queries_total', 'about:author'), 7
+        )
+        self.assertEqual(self.sample(
+            text, 'request_duration_seconds_count', 'about:author'
+        ), 5)
+
+    def test_snapshots_of_dead_workers_are_retired(self):
+        """Снимок завершившегося процесса переносится в общий файл,
+        а его счетчики остаются в сумме."""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        snapshot = metrics._empty()
+        snapshot.update(count=3, db_queries_total=4)
+        dead = os.path.join(TEMP_METRICS_DIR, f'{process.pid}.json')
+        with open(dead, 'w') as other:
+            json.dump({'about:tech': snapshot}, other)
+        for _ in range(2):
+            text = self.client.get(reverse('metrics')).content.decode()
+            self.assertEqual(
+                self.sample(text, 'db_queries_total', 'about:tech'), 4
+            )
+        self.assertFalse(os.path.exists(dead))
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_METRICS_DIR, metrics.RETIRED))
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='secret')
+    def test_metrics_require_token_address_or_staff(self):
+        """/metrics закрыт для посторонних."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 403)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer secret'
+        ).status_code, 200)
+        self.client.force_login(get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        ))
+        self.assertEqual(self.client.get(url).status_code, 200)
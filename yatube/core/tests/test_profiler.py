@@ -0,0 +1,78 @@
+import json
+import marshal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..models import RequestProfile
+from ..profiler import PROFILE_PARAM
+
+User = get_user_model()
+INDEX = reverse('posts:index')
+CREATE = reverse('posts:post_create')
+
+
+class ProfilerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_staff_flag_stores_profile(self):
+        """Профиль хранит дерево вызовов и SQL с шаблоном и кодом."""
+        response = self.staff_client.get(CREATE, {PROFILE_PARAM: 1})
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.view_name, 'posts:post_create')
+        self.assertEqual(profile.reason, RequestProfile.FLAG)
+        self.assertEqual(profile.user, self.staff)
+        self.assertIn('posts/views.py', profile.report)
+        queries = json.loads(profile.queries)
+        self.assertEqual(len(queries), profile.query_count)
+        self.assertTrue(all(query['source'] for query in queries))
+        # Выбор группы в форме читается из базы при рендеринге шаблона.
+        self.assertTrue(any(query['template'] for query in queries))
+        self.assertIsInstance(marshal.loads(bytes(profile.stats)), dict)
+
+    def test_flag_is_ignored_for_other_users(self):
+        client = Client()
+        client.get(INDEX, {PROFILE_PARAM: 1}, HTTP_X_PROFILE='1')
+        client.force_login(self.author)
+        client.get(INDEX, {PROFILE_PARAM: 1}, HTTP_X_PROFILE='1')
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILER_SAMPLE_RATE=1)
+    def test_sampled_requests_are_profiled(self):
+        Client().get(INDEX)
+        self.assertEqual(
+            RequestProfile.objects.get().reason, RequestProfile.SAMPLE
+        )
+
+    def test_admin_shows_and_downloads_profile(self):
+        self.staff_client.get(INDEX, HTTP_X_PROFILE='1')
+        profile = RequestProfile.objects.get()
+        change = self.staff_client.get(reverse(
+            'admin:core_requestprofile_change', args=(profile.pk,)
+        ))
+        self.assertContains(change, 'posts/views.py')
+        download = self.staff_client.get(reverse(
+            'admin:core_requestprofile_download', args=(profile.pk,)
+        ))
+        self.assertEqual(bytes(download.content), bytes(profile.stats))
+        self.assertEqual(
+            Client().get(reverse(
+                'admin:core_requestprofile_download', args=(profile.pk,)
+            )).status_code,
+            302,
+        )
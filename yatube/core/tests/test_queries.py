@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..queries import (
+    N_PLUS_ONE_THRESHOLD,
+    QueryBudgetExceeded,
+    QueryLog,
+    fingerprint,
+)
+
+User = get_user_model()
+
+
+class QueryInspectorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{index}')
+            for index in range(N_PLUS_ONE_THRESHOLD)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fingerprint_ignores_parameters(self):
+        self.assertEqual(
+            fingerprint('SELECT *\n  FROM t WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_repeated_statement_is_flagged(self):
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            for user in self.users:
+                User.objects.filter(pk=user.pk).first()
+            list(User.objects.filter(pk__in=[user.pk for user in self.users]))
+        self.assertEqual(log.total, N_PLUS_ONE_THRESHOLD + 1)
+        [(sql, count)] = log.repeated()
+        self.assertEqual(count, N_PLUS_ONE_THRESHOLD)
+        self.assertIn('"auth_user"."id" = %s', sql)
+
+    def test_budget_is_enforced_in_tests(self):
+        client = Client()
+        client.force_login(self.users[0])
+        client.get(reverse('posts:index'))
+        with override_settings(QUERY_BUDGETS={'posts:index': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                client.get(reverse('posts:index'))
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from posts.models import Post, User
+from ..replicas import PIN_COOKIE, PRIMARY, REPLICA, ReplicaMiddleware
+
+
+def read_alias(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+def write_then_read_alias(request):
+    Post(author=User(pk=1))
+    first = router.db_for_read(Post)
+    User.objects.filter(pk=0).update(first_name='')
+    return HttpResponse(f'{first} {router.db_for_read(Post)}')
+
+
+@override_settings(REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = mock.patch(
+            'core.replicas.replica_enabled', return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(router.db_for_read(Post), PRIMARY)
+        self.assertEqual(router.db_for_write(Post), PRIMARY)
+
+    def test_routing_inside_requests(self):
+        """Безопасный запрос читает с реплики, пока ничего не записал."""
+        cases = (
+            ('get', {}, read_alias, REPLICA, False),
+            ('get', {}, write_then_read_alias, f'{REPLICA} {PRIMARY}', True),
+            ('post', {}, read_alias, PRIMARY, True),
+            ('get', {PIN_COOKIE: '1'}, read_alias, PRIMARY, False),
+        )
+        for method, cookies, view, alias, pinned in cases:
+            with self.subTest(method=method, view=view.__name__,
+                              cookies=cookies):
+                request = getattr(self.factory, method)('/')
+                request.COOKIES.update(cookies)
+                response = ReplicaMiddleware(view)(request)
+                self.assertEqual(response.content.decode(), alias)
+                self.assertEqual(PIN_COOKIE in response.cookies, pinned)
+                if pinned:
+                    self.assertEqual(
+                        response.cookies[PIN_COOKIE]['max-age'], 5
+                    )
+        self.assertEqual(router.db_for_read(Post), PRIMARY)
+
+    def test_mirror_replica_is_not_used(self):
+        """В тестах реплика - зеркало default, чтение идет с default."""
+        mock.patch.stopall()
+        response = ReplicaMiddleware(read_alias)(self.factory.get('/'))
+        self.assertEqual(response.content.decode(), PRIMARY)
+
+
+class TwoFileReplicaTest(TransactionTestCase):
+    """Основная база и копия из sync_replica в отдельном файле.
+
+    Данные должны быть зафиксированы, иначе sqlite3 backup ждет
+    окончания транзакции, поэтому здесь TransactionTestCase.
+    """
+
+    databases = {PRIMARY, REPLICA}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='writer')
+        Post.objects.create(author=self.author, text='Старый пост')
+        # Удаление через ORM чистит и полнотекстовый индекс, который
+        # очистка базы после теста не трогает.
+        self.addCleanup(lambda: Post.objects.all().delete())
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+        replica = connections[REPLICA]
+        settings_dict = mock.patch.dict(
+            replica.settings_dict,
+            NAME=os.path.join(self.directory, 'replica.sqlite3'),
+        )
+        settings_dict.start()
+        self.addCleanup(settings_dict.stop)
+        self.addCleanup(replica.close)
+
+    def test_sync_requires_separate_replica(self):
+        connections[REPLICA].settings_dict['NAME'] = (
+            connections[PRIMARY].settings_dict['NAME']
+        )
+        with self.assertRaises(CommandError):
+            call_command('sync_replica', stdout=StringIO())
+
+    def test_user_sees_own_write_despite_replica_lag(self):
+        call_command('sync_replica', stdout=StringIO())
+        Post.objects.create(author=self.author, text='Свежий пост')
+        profile = reverse('posts:profile', args=(self.author.username,))
+
+        response = self.client.get(profile)
+        self.assertContains(response, 'Старый пост')
+        self.assertNotContains(response, 'Свежий пост')
+
+        response = self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertContains(self.client.get(profile), 'Свежий пост')
+
+        self.client.cookies.pop(PIN_COOKIE)
+        self.assertNotContains(self.client.get(profile), 'Свежий пост')
+        call_command('sync_replica', stdout=StringIO())
+        self.assertContains(self.client.get(profile), 'Свежий пост')
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+PROFILE_SNAPSHOT = '''
+import json
+from yatube import settings
+print(json.dumps({
+    'debug': settings.DEBUG,
+    'toolbar': 'debug_toolbar' in settings.INSTALLED_APPS,
+    'loaders': settings.TEMPLATES[0]['OPTIONS'].get('loaders'),
+    'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+    'pragmas': settings.SQLITE_PRAGMAS,
+}))
+'''
+
+
+class SettingsProfileTest(SimpleTestCase):
+    def load_profile(self, profile, **env):
+        environ = {**os.environ, 'YATUBE_PROFILE': profile}
+        environ.pop('YATUBE_SECRET_KEY', None)
+        environ.update(env)
+        output = subprocess.run(
+            [sys.executable, '-c', PROFILE_SNAPSHOT],
+            cwd=settings.BASE_DIR,
+            env=environ,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        return json.loads(output)
+
+    def test_production_profile_drops_debug_stack(self):
+        dev = self.load_profile('dev')
+        self.assertTrue(dev['debug'])
+        self.assertTrue(dev['toolbar'])
+        production = self.load_profile(
+            'production', YATUBE_SECRET_KEY='production-key'
+        )
+        self.assertFalse(production['debug'])
+        self.assertFalse(production['toolbar'])
+        self.assertEqual(
+            production['loaders'][0][0],
+            'django.template.loaders.cached.Loader',
+        )
+        self.assertGreater(production['conn_max_age'], 0)
+        self.assertEqual(production['pragmas']['journal_mode'], 'WAL')
+
+    def test_production_profile_requires_secret_key(self):
+        with self.assertRaises(subprocess.CalledProcessError) as error:
+            self.load_profile('production')
+        self.assertIn('YATUBE_SECRET_KEY', error.exception.stderr)
+
+    def test_sqlite_pragmas_are_applied_to_new_connections(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        default = connections['default']
+        wrapper = type(default)(
+            {
+                **default.settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            },
+            alias='pragmas',
+        )
+        self.addCleanup(wrapper.close)
+        with override_settings(SQLITE_PRAGMAS={
+            'journal_mode': 'WAL', 'busy_timeout': 1234,
+        }):
+            wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
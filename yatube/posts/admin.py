@@ -1,6 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
+from .constants import ADMIN_SEARCH_LIMIT
 from .models import Post, Group, Comment, Follow
+from .search import search_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +12,19 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = search_ids(search_term, limit=ADMIN_SEARCH_LIMIT + 1)
+        if len(ids) > ADMIN_SEARCH_LIMIT:
+            ids = ids[:ADMIN_SEARCH_LIMIT]
+            messages.warning(
+                request,
+                f'Показаны только {ADMIN_SEARCH_LIMIT} самых релевантных '
+                f'постов, уточните запрос.',
+            )
+        return queryset.filter(pk__in=ids), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = (
@@ -39,8 +54,9 @@ class FollowAdmin(admin.ModelAdmin):
         'pk',
         'author',
         'user',
+        'notify',
     )
-    list_filter = ('author',)
+    list_filter = ('author', 'notify')
 
 
 admin.site.register(Post, PostAdmin)
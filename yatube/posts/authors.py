@@ -0,0 +1,55 @@
+"""Кэш username -> автор для профиля, подписок и лент автора.
+
+В кэше лежит User только с id, username и именем (остальные поля
+отложены и при обращении догружаются запросом). Несуществующие имена
+запоминаются на MISSING_AUTHOR_TIMEOUT, поэтому перебор имен ботами
+не доходит до auth_user. Записи сбрасываются сигналами пользователя.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.http import Http404
+
+from .constants import AUTHOR_TIMEOUT, MISSING_AUTHOR_TIMEOUT
+from .models import User
+
+SUMMARY_FIELDS = ('id', 'username', 'first_name', 'last_name')
+MISSING = False
+
+
+def author_key(username):
+    # Имя из URL может быть любой строкой, в ключ идет его хэш.
+    return f'author:{hashlib.md5(username.encode()).hexdigest()}'
+
+
+def get_author(username):
+    """Возвращает автора с полями SUMMARY_FIELDS или None."""
+    if len(username) > User._meta.get_field('username').max_length:
+        return None
+    key = author_key(username)
+    author = cache.get(key)
+    if author is None:
+        author = (
+            User.objects.only(*SUMMARY_FIELDS)
+            .filter(username=username)
+            .first()
+        )
+        if author is None:
+            author = MISSING
+        cache.set(
+            key,
+            author,
+            MISSING_AUTHOR_TIMEOUT if author is MISSING else AUTHOR_TIMEOUT,
+        )
+    return None if author is MISSING else author
+
+
+def get_author_or_404(username):
+    author = get_author(username)
+    if author is None:
+        raise Http404(f'Нет пользователя {username}')
+    return author
+
+
+def forget(*usernames):
+    cache.delete_many([author_key(username) for username in usernames])
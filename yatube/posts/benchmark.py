@@ -0,0 +1,152 @@
+"""Нагрузочный прогон основных страниц через тестовый клиент.
+
+Для каждой страницы снимаются перцентили времени ответа, а по одному
+инструментированному запросу — число SQL-запросов, их суммарное время
+и число полных проходов по таблицам из EXPLAIN QUERY PLAN (SQLite не
+сообщает, сколько строк было прочитано, поэтому это ближайшая оценка).
+"""
+import math
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+PERCENTILES = (50, 90, 95, 99)
+# Адрес вне INTERNAL_IPS, чтобы debug_toolbar не искажал замеры.
+REMOTE_ADDR = '10.0.0.1'
+
+
+def percentile(values, q):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def full_scans(sql):
+    if connection.vendor != 'sqlite' or not sql.lstrip().startswith('SELECT'):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+    return sum(
+        1 for step in plan
+        if step.startswith('SCAN') and 'USING' not in step
+    )
+
+
+def targets(username=None):
+    """Возвращает (имя view, url, пользователь или None) для прогона."""
+    reader = (
+        User.objects.get(username=username) if username
+        else User.objects.filter(
+            pk__in=AuthorStats.objects
+            .order_by('-following')
+            .values('user_id')[:1]
+        ).first()
+    )
+    author = User.objects.filter(
+        pk__in=AuthorStats.objects.order_by('-posts').values('user_id')[:1]
+    ).first()
+    group = (
+        Group.objects
+        .annotate(total=Count('group_posts'))
+        .order_by('-total')
+        .first()
+    )
+    post = (
+        Post.objects.filter(author=author).first() if author
+        else Post.objects.first()
+    )
+    result = [('index', reverse('posts:index'), None)]
+    if group:
+        result.append((
+            'group_posts',
+            reverse('posts:group_list', args=(group.slug,)),
+            None,
+        ))
+    if author:
+        result.append((
+            'profile',
+            reverse('posts:profile', args=(author.username,)),
+            None,
+        ))
+    if post:
+        result.append((
+            'post_detail',
+            reverse('posts:post_detail', args=(post.pk,)),
+            reader,
+        ))
+    if reader:
+        result.append(('follow_index', reverse('posts:follow_index'), reader))
+    return result
+
+
+def measure(url, user=None, iterations=50, warmup=5):
+    client = Client(REMOTE_ADDR=REMOTE_ADDR)
+    if user is not None:
+        client.force_login(user)
+    for _ in range(warmup):
+        client.get(url)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    queries = list(context.captured_queries)
+    result = {
+        'url': url,
+        'status': response.status_code,
+        'mean_ms': sum(timings) / len(timings),
+        'max_ms': max(timings),
+        'queries': len(queries),
+        'query_ms': sum(float(query['time']) * 1000 for query in queries),
+        'full_scans': sum(full_scans(query['sql']) for query in queries),
+    }
+    for q in PERCENTILES:
+        result[f'p{q}_ms'] = percentile(timings, q)
+    return result
+
+
+def run(iterations=50, warmup=5, username=None):
+    return {
+        'created': timezone.now().isoformat(),
+        'profile': settings.PROFILE,
+        'database': connection.vendor,
+        'iterations': iterations,
+        'warmup': warmup,
+        'rows': {
+            model.__name__.lower(): model.objects.count()
+            for model in (User, Group, Post, Comment, Follow)
+        },
+        'views': {
+            name: measure(url, user, iterations, warmup)
+            for name, url, user in targets(username)
+        },
+    }
+
+
+def compare(baseline, report):
+    """Строки сравнения перцентилей с прошлым прогоном."""
+    lines = [f'{baseline.get("profile", "?")} -> {report["profile"]}']
+    for name, result in report['views'].items():
+        before = baseline['views'].get(name)
+        if before is None:
+            continue
+        changes = []
+        for key in ('p50_ms', 'p99_ms'):
+            change = f'{key} {before[key]:.1f} -> {result[key]:.1f} ms'
+            if before[key]:
+                change += f' ({result[key] / before[key] - 1:+.0%})'
+            changes.append(change)
+        lines.append(f'{name}: ' + ', '.join(changes))
+    return lines
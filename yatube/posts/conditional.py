@@ -0,0 +1,164 @@
+"""ETag, Last-Modified и кэш страниц для лент и страницы поста.
+
+Время последнего изменения каждой области (главная лента, группа, автор,
+пост и весь сайт) хранится в кэше и обновляется сигналами. Валидатор
+читает эти отметки одним get_many, поэтому ответ 304 отдается без
+запроса страницы и рендеринга шаблонов. Те же отметки входят в ключ
+кэша страниц для анонимов: изменение области делает старые ключи
+ненужными, не затрагивая страницы других областей.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+
+from .authors import get_author
+from .constants import PAGE_TIMEOUT
+from .models import Group
+
+SITE = ('site',)
+INDEX = ('index',)
+TRENDING = ('trending',)
+
+
+def scope_key(scope):
+    return 'modified:' + ':'.join(str(part) for part in scope)
+
+
+def touch(*scopes):
+    now = time.time()
+    cache.set_many({scope_key(scope): now for scope in scopes}, None)
+
+
+def last_modified(scopes):
+    keys = [scope_key(scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    for key in set(keys) - set(stamps):
+        # Отметка вытеснена из кэша: считаем, что область изменилась
+        # только что, иначе клиент мог бы получить 304 на старую страницу.
+        cache.add(key, time.time(), None)
+        stamps[key] = cache.get(key, time.time())
+    return max(stamps.values())
+
+
+def index_scopes(request):
+    return [INDEX]
+
+
+def trending_scopes(request):
+    # Посты рейтинга меняются вместе с главной лентой.
+    return [INDEX, TRENDING]
+
+
+def group_scopes(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    )
+    return None if group_id is None else [('group', group_id)]
+
+
+def author_scopes(request, username):
+    author = get_author(username)
+    return None if author is None else [('author', author.pk)]
+
+
+def request_scopes(request, scopes_func, *args, **kwargs):
+    """scopes_func, вычисленная один раз на запрос."""
+    if not hasattr(request, '_scopes'):
+        request._scopes = scopes_func(request, *args, **kwargs)
+    return request._scopes
+
+
+def _validators(request, scopes_func, public, args, kwargs):
+    if not hasattr(request, '_validators'):
+        scopes = request_scopes(request, scopes_func, *args, **kwargs)
+        if scopes is None:
+            request._validators = None, None
+            return request._validators
+        stamp = last_modified([SITE, *scopes])
+        raw = '|'.join(str(part) for part in (
+            stamp,
+            request.get_full_path(),
+            None if public else request.user.pk,
+            get_language(),
+        ))
+        request._validators = (
+            hashlib.md5(raw.encode()).hexdigest(),
+            datetime.fromtimestamp(stamp, tz=timezone.utc),
+        )
+    return request._validators
+
+
+def conditional(scopes_func, public=False):
+    """Отдает 304, если области scopes_func не менялись.
+
+    scopes_func(request, *args, **kwargs) возвращает список областей
+    страницы или None, если валидатор построить нельзя (например, для
+    несуществующей группы): тогда view выполняется как обычно.
+    public=True для ответов, не зависящих от пользователя.
+    """
+    def decorator(view):
+        @condition(
+            etag_func=lambda request, *args, **kwargs: _validators(
+                request, scopes_func, public, args, kwargs
+            )[0],
+            last_modified_func=lambda request, *args, **kwargs: _validators(
+                request, scopes_func, public, args, kwargs
+            )[1],
+        )
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            # Без no-cache браузер мог бы показывать страницу по
+            # эвристике Last-Modified, не спрашивая сервер.
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def page_key(request, scopes):
+    raw = '|'.join(str(part) for part in (
+        request.build_absolute_uri(),
+        get_language(),
+        last_modified([SITE, *scopes]),
+    ))
+    return f'page:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def anonymous_page_cache(scopes_func, timeout=PAGE_TIMEOUT):
+    """Кэширует ответы 200 для анонимных GET-запросов.
+
+    Ключ включает путь с параметрами (страницу или курсор), язык
+    и отметки изменения областей scopes_func.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            scopes = request_scopes(request, scopes_func, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = page_key(request, scopes)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    timeout,
+                )
+            return response
+        return wrapper
+    return decorator
@@ -1 +1,30 @@
 AMOUNT_OF_PUBLICATIONS = 10
+AMOUNT_OF_COMMENTS = 20
+PAGE_PARAM = 'page'
+CURSOR_PARAM = 'cursor'
+PAGE_WINDOW = 3
+FANOUT_LIMIT = 1000
+FANOUT_BATCH_SIZE = 500
+TIMELINE_BACKFILL = 1000
+PULL_AUTHORS_CACHE_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_TIMEOUT = 60 * 5
+CARD_TEMPLATE = 'posts/includes/post_list.html'
+CARD_SEPARATOR = '<hr>'
+CARD_TIMEOUT = 60 * 60 * 24
+FRAGMENT_HITS_KEY = 'fragment:hits'
+FRAGMENT_MISSES_KEY = 'fragment:misses'
+ADMIN_SEARCH_LIMIT = 1000
+THUMBNAIL_VARIANTS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+FEED_SIZE = 50
+FEED_TIMEOUT = 60 * 60 * 24
+PAGE_TIMEOUT = 60 * 60
+AUTHOR_TIMEOUT = 60 * 60 * 24
+MISSING_AUTHOR_TIMEOUT = 60 * 5
+DIGEST_WINDOW = 60 * 15
+DIGEST_BATCH_SIZE = 100
+TRENDING_SIZE = 100
+TRENDING_WINDOW_HOURS = 48
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_INTERVAL = 60 * 5
@@ -0,0 +1,133 @@
+"""Дайджесты новых постов для подписчиков, включивших уведомления.
+
+Новый пост только попадает в DigestEntry, а рассылку за окно
+DIGEST_WINDOW ставит одна фоновая задача на окно, сколько бы постов
+в нем ни вышло. Задача берет все ожидающие посты сразу и собирает
+каждому подписчику одно письмо обо всех новых постах его авторов.
+Письмо зависит только от набора постов, поэтому рендерится один раз
+на набор, а письма уходят пачками по DIGEST_BATCH_SIZE через
+send_messages одного соединения.
+
+Подписчики обходятся по возрастанию id, и вместе с отправкой пачки
+в той же транзакции записывается DigestEntry.sent_to. Повтор упавшей
+задачи не шлет письма тем, кому они уже ушли: с QueuedEmailBackend
+отправка - это запись Job в ту же транзакцию, с другими бэкендами
+повториться может только одна пачка.
+"""
+import time
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from core.jobs import enqueue, job
+
+from .constants import DIGEST_BATCH_SIZE, DIGEST_WINDOW
+from .models import DigestEntry, Follow, Post
+
+
+def schedule(post):
+    if not Follow.objects.filter(
+        author_id=post.author_id, notify=True
+    ).exists():
+        return
+    DigestEntry.objects.create(post=post)
+    now = time.time()
+    window = int(now // DIGEST_WINDOW)
+    enqueue(
+        send_digests,
+        key=f'digests:{window}',
+        delay=(window + 1) * DIGEST_WINDOW - now,
+    )
+
+
+def _recipients(author_ids):
+    """Тройки (id, email, id авторов) подписчиков с уведомлениями."""
+    rows = (
+        Follow.objects
+        .filter(author_id__in=author_ids, notify=True)
+        .exclude(user__email='')
+        .order_by('user_id')
+        .values_list('user_id', 'user__email', 'author_id')
+        .iterator()
+    )
+    for user_id, follows in groupby(rows, key=lambda row: row[0]):
+        follows = list(follows)
+        yield user_id, follows[0][1], frozenset(row[2] for row in follows)
+
+
+def _render(posts):
+    context = {'posts': posts, 'site_url': settings.SITE_URL}
+    subject = render_to_string('posts/email/digest_subject.txt', context)
+    body = render_to_string('posts/email/digest.txt', context)
+    return ' '.join(subject.split()), body
+
+
+def send(posts, sent_to=None):
+    """Рассылает дайджест о posts и возвращает число писем.
+
+    sent_to - словарь {id поста: id подписчика}: о посте пишется только
+    подписчикам с большим id. Отправленная пачка отмечается в sent_to
+    и в DigestEntry в той же транзакции.
+    """
+    sent_to = {} if sent_to is None else sent_to
+    rendered = {}
+    sent = 0
+    batch = []
+    connection = get_connection()
+
+    def flush(last_user_id):
+        nonlocal sent, batch
+        with transaction.atomic():
+            sent += connection.send_messages(batch) or 0
+            DigestEntry.objects.filter(
+                post_id__in=[post.pk for post in posts],
+                sent_to__lt=last_user_id,
+            ).update(sent_to=last_user_id)
+        for post in posts:
+            sent_to[post.pk] = max(sent_to.get(post.pk, 0), last_user_id)
+        batch = []
+
+    with connection:
+        authors = {post.author_id for post in posts}
+        user_id = None
+        for user_id, email, author_ids in _recipients(authors):
+            news = tuple(
+                post for post in posts
+                if post.author_id in author_ids
+                and sent_to.get(post.pk, 0) < user_id
+            )
+            if not news:
+                continue
+            if news not in rendered:
+                rendered[news] = _render(news)
+            subject, body = rendered[news]
+            batch.append(EmailMessage(
+                subject, body, to=[email], connection=connection
+            ))
+            if len(batch) == DIGEST_BATCH_SIZE:
+                flush(user_id)
+        if batch:
+            flush(user_id)
+    return sent
+
+
+@job
+def send_digests():
+    # Все посты берутся сразу: иначе подписчик авторов из разных
+    # частей выборки получил бы несколько писем.
+    sent_to = dict(DigestEntry.objects.values_list('post_id', 'sent_to'))
+    if not sent_to:
+        return
+    send(
+        list(
+            Post.objects
+            .filter(pk__in=sent_to)
+            .select_related('author', 'group')
+            .order_by('author_id', 'pub_date')
+        ),
+        sent_to,
+    )
+    DigestEntry.objects.filter(post_id__in=sent_to).delete()
@@ -0,0 +1,145 @@
+"""Потоковая выгрузка постов автора или группы.
+
+Записи совпадают по формату с import_data, поэтому архив можно загрузить
+обратно. Посты и комментарии читаются через iterator(), а ZIP пишется
+в поток без перемотки, так что ни выборка, ни файлы картинок целиком
+в памяти не держатся.
+"""
+import io
+import json
+import zipfile
+
+from django.utils import timezone
+
+from .models import Comment, Group, Post
+
+CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+IMAGES_DIR = 'images/'
+
+
+def group_record(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def post_record(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'pub_date': post.pub_date.isoformat(),
+        'image': post.image.name or None,
+    }
+
+
+def comment_record(comment):
+    return {
+        'id': comment.pk,
+        'post': comment.post_id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def selection(author=None, group=None):
+    """Возвращает группы, посты и комментарии для выгрузки."""
+    if author is not None:
+        posts = Post.objects.filter(author=author)
+        groups = Group.objects.filter(group_posts__author=author).distinct()
+    else:
+        posts = Post.objects.filter(group=group)
+        groups = Group.objects.filter(pk=group.pk)
+    comments = Comment.objects.filter(post__in=posts.values('pk'))
+    return (
+        groups.order_by('pk'),
+        posts.select_related('author', 'group').order_by('pk'),
+        comments.select_related('author').order_by('pk'),
+    )
+
+
+def _lines(queryset, to_record, kind=None):
+    for obj in queryset.iterator(chunk_size=CHUNK_SIZE):
+        record = to_record(obj)
+        if kind is not None:
+            record = {'type': kind, **record}
+        yield (json.dumps(record, ensure_ascii=False) + '\n').encode()
+
+
+def ndjson(author=None, group=None):
+    groups, posts, comments = selection(author, group)
+    yield from _lines(groups, group_record, 'group')
+    yield from _lines(posts, post_record, 'post')
+    yield from _lines(comments, comment_record, 'comment')
+
+
+class _Stream(io.RawIOBase):
+    """Неперематываемый файл, из которого забирают записанные байты."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _entry(name, compress_type):
+    info = zipfile.ZipInfo(name, timezone.now().timetuple()[:6])
+    info.compress_type = compress_type
+    return info
+
+
+def archive(author=None, group=None, storage=None):
+    """ZIP с groups.jsonl, posts.jsonl, comments.jsonl и картинками."""
+    groups, posts, comments = selection(author, group)
+    storage = storage or Post._meta.get_field('image').storage
+    stream = _Stream()
+    images = set()
+
+    def image_names(post_record):
+        if post_record['image']:
+            images.add(post_record['image'])
+        return post_record
+
+    with zipfile.ZipFile(stream, 'w') as target:
+        for name, lines in (
+            ('groups.jsonl', _lines(groups, group_record)),
+            ('posts.jsonl', _lines(
+                posts, lambda post: image_names(post_record(post))
+            )),
+            ('comments.jsonl', _lines(comments, comment_record)),
+        ):
+            entry = _entry(name, zipfile.ZIP_DEFLATED)
+            with target.open(entry, 'w', force_zip64=True) as output:
+                for line in lines:
+                    output.write(line)
+                    if stream.size >= FILE_CHUNK_SIZE:
+                        yield stream.pop()
+        for name in sorted(images):
+            if not storage.exists(name):
+                continue
+            # Картинки уже сжаты, поэтому кладутся без компрессии.
+            entry = _entry(IMAGES_DIR + name, zipfile.ZIP_STORED)
+            with storage.open(name) as source, \
+                    target.open(entry, 'w', force_zip64=True) as output:
+                for chunk in source.chunks(FILE_CHUNK_SIZE):
+                    output.write(chunk)
+                    yield stream.pop()
+    yield stream.pop()
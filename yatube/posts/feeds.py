@@ -0,0 +1,152 @@
+"""RSS и Atom для главной ленты, групп и авторов.
+
+Лента строится из последних FEED_SIZE постов по индексам post_*_feed_idx.
+Готовый XML кэшируется под ключом с отметкой изменения области из
+conditional, поэтому новый пост просто делает старый ключ ненужным,
+а опрашивающие клиенты с ETag получают 304.
+"""
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .authors import get_author_or_404
+from .conditional import (
+    SITE,
+    author_scopes,
+    conditional,
+    group_scopes,
+    index_scopes,
+    last_modified,
+    request_scopes,
+)
+from .constants import FEED_SIZE, FEED_TIMEOUT
+from .models import Group, Post
+
+
+class PostFeed(Feed):
+    scopes = None
+
+    def __call__(self, request, *args, **kwargs):
+        scopes = request_scopes(request, self.scopes, *args, **kwargs)
+        if scopes is None:
+            return super().__call__(request, *args, **kwargs)
+        key = ':'.join(str(part) for part in (
+            'feed',
+            # Ссылки в ленте абсолютные, поэтому ключ зависит от хоста.
+            request.build_absolute_uri(request.path),
+            last_modified([SITE, *scopes]),
+        ))
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = super().__call__(request, *args, **kwargs)
+        # Last-Modified выставляет conditional по отметке области: дата
+        # последнего поста не меняется при правке или удалении.
+        del response['Last-Modified']
+        cache.set(
+            key, (response.content, response['Content-Type']), FEED_TIMEOUT
+        )
+        return response
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return (
+            self.posts(obj)
+            .select_related('author', 'group')
+            .order_by('-pub_date', '-pk')[:FEED_SIZE]
+        )
+
+    def item_title(self, item):
+        return str(item)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group_id else []
+
+
+class IndexFeed(PostFeed):
+    title = 'Yatube: последние посты'
+    description = 'Новые записи всех авторов.'
+    scopes = staticmethod(index_scopes)
+
+    def link(self):
+        return reverse('posts:index')
+
+
+class GroupFeed(PostFeed):
+    scopes = staticmethod(group_scopes)
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=(obj.slug,))
+
+    def posts(self, obj):
+        return obj.group_posts.all()
+
+
+class AuthorFeed(PostFeed):
+    scopes = staticmethod(author_scopes)
+
+    def get_object(self, request, username):
+        return get_author_or_404(username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Посты пользователя {obj.username}.'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=(obj.username,))
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class IndexAtomFeed(IndexFeed):
+    feed_type = Atom1Feed
+    subtitle = IndexFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def feed_view(feed_class):
+    feed = feed_class()
+    return conditional(feed.scopes, public=True)(feed)
@@ -0,0 +1,106 @@
+"""Кэш отрендеренных карточек постов для лент.
+
+Ключ карточки содержит версии поста, его группы и автора. Версии
+увеличиваются сигналами при любом сохранении, поэтому старые карточки
+не инвалидируются явно, а просто перестают запрашиваться.
+"""
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
+
+from .constants import (
+    CARD_SEPARATOR,
+    CARD_TEMPLATE,
+    CARD_TIMEOUT,
+    FRAGMENT_HITS_KEY,
+    FRAGMENT_MISSES_KEY,
+)
+
+
+def version_key(kind, pk):
+    return f'fragment:version:{kind}:{pk}'
+
+
+def bump_version(kind, pk):
+    key = version_key(kind, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        _init_version(key)
+
+
+def _init_version(key):
+    # Время в миллисекундах, а не 1: после вытеснения версии из кэша
+    # нельзя вернуться к уже использованному номеру.
+    cache.add(key, int(time.time() * 1000), None)
+    return cache.get(key)
+
+
+def _versions(posts):
+    keys = set()
+    for post in posts:
+        keys.add(version_key('post', post.pk))
+        keys.add(version_key('user', post.author_id))
+        if post.group_id:
+            keys.add(version_key('group', post.group_id))
+    versions = cache.get_many(keys)
+    for key in keys - versions.keys():
+        versions[key] = _init_version(key)
+    return versions
+
+
+def _count(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def fragment_stats():
+    stats = cache.get_many([FRAGMENT_HITS_KEY, FRAGMENT_MISSES_KEY])
+    return {
+        'hits': stats.get(FRAGMENT_HITS_KEY, 0),
+        'misses': stats.get(FRAGMENT_MISSES_KEY, 0),
+    }
+
+
+def card_key(post, versions, variant):
+    return ':'.join(str(part) for part in (
+        'fragment:card',
+        post.pk,
+        post.pub_date.timestamp(),
+        versions[version_key('post', post.pk)],
+        versions[version_key('user', post.author_id)],
+        versions.get(version_key('group', post.group_id), 0),
+        variant,
+        get_language(),
+    ))
+
+
+def render_cards(posts, skip_author_info=False, skip_group_info=False):
+    posts = list(posts)
+    if not posts:
+        return ''
+    versions = _versions(posts)
+    variant = f'{int(skip_author_info)}{int(skip_group_info)}'
+    keys = [card_key(post, versions, variant) for post in posts]
+    cached = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cached:
+            missing[key] = render_to_string(CARD_TEMPLATE, {
+                'post': post,
+                'skip_author_info': skip_author_info,
+                'skip_group_info': skip_group_info,
+            })
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    _count(FRAGMENT_HITS_KEY, len(posts) - len(missing))
+    _count(FRAGMENT_MISSES_KEY, len(missing))
+    cached.update(missing)
+    return CARD_SEPARATOR.join(cached[key] for key in keys)
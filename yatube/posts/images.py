@@ -0,0 +1,64 @@
+"""Подсчет ссылок на файлы картинок постов.
+
+Одинаковые картинки хранятся одним файлом (см. ContentAddressedStorage),
+поэтому файл удаляется только когда на него не ссылается ни один пост.
+Ссылку берет хранилище при сохранении файла, а снимают ее сигналы
+при смене картинки и удалении поста. Файл удаляется вместе со строкой
+ImageBlob под ее блокировкой, поэтому хранилище, которое уже взяло
+ссылку, видит файл на месте или пишет его заново.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import ImageBlob, Post
+
+
+def incref(name, count=1):
+    if not name:
+        return
+    updated = ImageBlob.objects.filter(name=name).update(
+        references=F('references') + count
+    )
+    if not updated:
+        blob, created = ImageBlob.objects.get_or_create(
+            name=name, defaults={'references': count}
+        )
+        if not created:
+            incref(name, count)
+
+
+def decref(name):
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name).update(
+        references=Greatest(F('references') - 1, Value(0))
+    )
+    collect(name)
+
+
+def collect(name):
+    if ImageBlob.objects.filter(name=name, references=0).exists():
+        transaction.on_commit(lambda: _delete_file(name))
+
+
+def discard(names):
+    """Удаляет сохраненные файлы, на которые так и не сослался пост."""
+    for name in set(filter(None, names)):
+        # Ссылку хранилища откатила транзакция: строки может не быть.
+        ImageBlob.objects.get_or_create(
+            name=name, defaults={'references': 0}
+        )
+        _delete_file(name)
+
+
+def _delete_file(name):
+    # Пока транзакция коммитилась, тот же файл могли загрузить заново:
+    # строка удаляется, только если ссылок все еще нет, а файл стирается
+    # до коммита, пока строка заблокирована.
+    with transaction.atomic():
+        deleted, _ = ImageBlob.objects.filter(
+            name=name, references=0
+        ).delete()
+        if deleted:
+            Post._meta.get_field('image').storage.delete(name)
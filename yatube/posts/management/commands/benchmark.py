@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа и SQL-запросы основных страниц '
+        'и сохраняет результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--username',
+            help='Читатель для ленты подписок и страницы поста.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для отчета; по умолчанию отчет выводится в stdout.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Отчет прошлого прогона, с которым сравнить перцентили.',
+        )
+
+    def handle(self, *args, **options):
+        report = benchmark.run(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            username=options['username'],
+        )
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                for line in benchmark.compare(json.load(baseline), report):
+                    self.stdout.write(line)
+        if not options['output']:
+            self.stdout.write(data)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.write(data)
+        for name, result in report['views'].items():
+            self.stdout.write(
+                f'{name}: p50 {result["p50_ms"]:.1f} ms, '
+                f'p99 {result["p99_ms"]:.1f} ms, '
+                f'запросов {result["queries"]}'
+            )
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии и картинки автора или группы '
+        'в ZIP или NDJSON.'
+    )
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--author', help='Имя пользователя.')
+        scope.add_argument('--group', help='Slug группы.')
+        parser.add_argument(
+            '--format', choices=('zip', 'ndjson'), default='zip'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки; по умолчанию пишется в stdout.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['author']:
+                scope = {
+                    'author': User.objects.get(username=options['author'])
+                }
+            else:
+                scope = {'group': Group.objects.get(slug=options['group'])}
+        except (User.DoesNotExist, Group.DoesNotExist):
+            raise CommandError('Автор или группа не найдены.')
+        if options['format'] == 'zip':
+            chunks = export.archive(**scope)
+        else:
+            chunks = export.ndjson(**scope)
+        if not options['output']:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        written = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        self.stdout.write(f'Записано байт: {written}')
@@ -0,0 +1,336 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import authors, images
+from posts.models import Comment, Group, ImportProgress, Post, User
+from posts.utils import batches
+
+BATCH_SIZE = 2000
+KINDS = ('groups', 'posts', 'comments')
+MAX_REPORTED_ERRORS = 20
+
+
+class RecordError(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует группы, посты или комментарии из JSONL или '
+        'CSV пачками bulk_create; прерванный импорт продолжается с '
+        'последней сохраненной пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=KINDS, required=True)
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--images',
+            help='Каталог, относительно которого заданы пути картинок.',
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Создавать отсутствующих авторов без пароля.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                'Ключ прогресса в базе; по умолчанию абсолютный путь '
+                'к файлу.'
+            ),
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать заново, не учитывая сохраненный прогресс.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.users = {}
+        self.groups = {}
+        self.errors = 0
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        checkpoint = options['checkpoint'] or os.path.abspath(path)
+        if options['restart']:
+            ImportProgress.objects.filter(name=checkpoint).delete()
+        done = self.load_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Продолжаем с записи {done + 1}')
+        importer = getattr(self, f'import_{options["kind"]}')
+        imported = 0
+        with open(path, encoding='utf-8', newline='') as source:
+            records = islice(self.read(source, fmt), done, None)
+            for batch in batches(records, options['batch_size']):
+                self.saved_images = []
+                try:
+                    # Прогресс пишется в транзакции пачки: после сбоя
+                    # пачка не загрузится повторно.
+                    with transaction.atomic():
+                        imported += importer(self.valid(batch))
+                        self.save_checkpoint(checkpoint, batch[-1][0])
+                finally:
+                    # Файлы пишутся до вставки постов: после отката
+                    # или пропуска записи на них никто не ссылается.
+                    images.discard(self.saved_images)
+        ImportProgress.objects.filter(name=checkpoint).delete()
+        self.stdout.write(
+            f'Импортировано: {imported}, пропущено с ошибками: {self.errors}'
+        )
+
+    def read(self, source, fmt):
+        """Отдает пары (номер записи, словарь), не читая файл целиком."""
+        if fmt == 'csv':
+            yield from enumerate(csv.DictReader(source), start=1)
+            return
+        number = 0
+        for line in source:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                record = RecordError(f'некорректный JSON: {error}')
+            if not isinstance(record, (dict, RecordError)):
+                record = RecordError('запись должна быть объектом JSON')
+            yield number, record
+
+    def valid(self, batch):
+        for number, record in batch:
+            if isinstance(record, RecordError):
+                self.report(number, record)
+                continue
+            yield number, record
+
+    def report(self, number, error):
+        self.errors += 1
+        if self.errors <= MAX_REPORTED_ERRORS:
+            self.stderr.write(f'Запись {number}: {error}')
+
+    def load_checkpoint(self, checkpoint):
+        state = ImportProgress.objects.filter(name=checkpoint).first()
+        if state is None:
+            return 0
+        if (state.path != os.path.abspath(self.options['path'])
+                or state.kind != self.options['kind']):
+            raise CommandError(
+                f'Прогресс {checkpoint} относится к другому импорту, '
+                'укажите --restart или другой --checkpoint.'
+            )
+        return state.done
+
+    def save_checkpoint(self, checkpoint, done):
+        ImportProgress.objects.update_or_create(name=checkpoint, defaults={
+            'path': os.path.abspath(self.options['path']),
+            'kind': self.options['kind'],
+            'done': done,
+        })
+
+    def build(self, batch, factory):
+        objs = []
+        for number, record in batch:
+            try:
+                objs.append(factory(record))
+            except RecordError as error:
+                self.report(number, error)
+        return objs
+
+    def resolve_users(self, records):
+        names = {record.get('author') for _, record in records} - {None}
+        missing = names - set(self.users)
+        if missing and self.options['create_users']:
+            password = make_password(None)
+            User.objects.bulk_create(
+                (User(username=name, password=password) for name in missing),
+                ignore_conflicts=True,
+            )
+            # bulk_create не шлет сигналов, а имена могли быть
+            # закэшированы как несуществующие.
+            authors.forget(*missing)
+        self.users.update(
+            User.objects
+            .filter(username__in=missing)
+            .values_list('username', 'pk')
+        )
+
+    def resolve_groups(self, records):
+        slugs = {record.get('group') for _, record in records} - {None, ''}
+        missing = slugs - set(self.groups)
+        self.groups.update(
+            Group.objects.filter(slug__in=missing).values_list('slug', 'pk')
+        )
+
+    def user_id(self, record):
+        try:
+            return self.users[record.get('author')]
+        except KeyError:
+            raise RecordError(f'неизвестный автор {record.get("author")!r}')
+
+    def group_id(self, record):
+        slug = record.get('group')
+        if not slug:
+            return None
+        try:
+            return self.groups[slug]
+        except KeyError:
+            raise RecordError(f'неизвестная группа {slug!r}')
+
+    def required(self, record, field):
+        value = record.get(field)
+        if not value:
+            raise RecordError(f'не заполнено поле {field}')
+        return value
+
+    def pk(self, record):
+        value = record.get('id')
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise RecordError(f'некорректный id {value!r}')
+
+    def date(self, record, field):
+        value = record.get(field)
+        if not value:
+            return timezone.now()
+        try:
+            date = parse_datetime(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise RecordError(f'некорректная дата {value!r}')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def image(self, record):
+        path = record.get('image')
+        if not path:
+            return ''
+        root = self.options['images']
+        if not root:
+            raise RecordError('для картинок нужен --images')
+        root = os.path.realpath(root)
+        full_path = os.path.realpath(os.path.join(root, path))
+        if not full_path.startswith(root + os.sep):
+            raise RecordError(f'путь {path!r} вне каталога картинок')
+        if not os.path.isfile(full_path):
+            raise RecordError(f'нет файла {path!r}')
+        field = Post._meta.get_field('image')
+        with open(full_path, 'rb') as image:
+            name = field.storage.save(
+                field.generate_filename(None, os.path.basename(full_path)),
+                File(image),
+            )
+        self.saved_images.append(name)
+        return name
+
+    def import_groups(self, batch):
+        objs = self.build(list(batch), lambda record: Group(
+            slug=self.required(record, 'slug'),
+            title=self.required(record, 'title'),
+            description=record.get('description') or '',
+        ))
+        slugs = {group.slug for group in objs}
+        existing = Group.objects.filter(slug__in=slugs)
+        before = existing.count()
+        Group.objects.bulk_create(objs, ignore_conflicts=True)
+        # Группы с уже занятым slug пропускаются и не считаются.
+        return existing.count() - before
+
+    def resolve_post_ids(self, records):
+        """Занятые id постов, которые указаны в записях пачки."""
+        ids = set()
+        for _, record in records:
+            try:
+                ids.add(self.pk(record))
+            except RecordError:
+                pass
+        ids.discard(None)
+        return set(
+            Post.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+
+    def post_pk(self, record, taken):
+        pk = self.pk(record)
+        if pk is not None:
+            if pk in taken:
+                raise RecordError(f'пост с id {pk} уже есть')
+            taken.add(pk)
+        return pk
+
+    def import_posts(self, batch):
+        batch = list(batch)
+        self.resolve_users(batch)
+        self.resolve_groups(batch)
+        taken = self.resolve_post_ids(batch)
+        objs = self.build(batch, lambda record: Post(
+            pk=self.post_pk(record, taken),
+            text=self.required(record, 'text'),
+            author_id=self.user_id(record),
+            group_id=self.group_id(record),
+            pub_date=self.date(record, 'pub_date'),
+            image=self.image(record),
+        ))
+        explicit_ids = any(post.pk for post in objs)
+        # Остальные pk назначает база; bulk_create находит их сам.
+        Post.objects.with_dates().bulk_create(objs)
+        if explicit_ids:
+            # Явные id не сдвигают последовательность pk в PostgreSQL.
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Post]
+                ):
+                    cursor.execute(sql)
+        return len(objs)
+
+    def import_comments(self, batch):
+        batch = list(batch)
+        self.resolve_users(batch)
+        post_ids = set(
+            Post.objects
+            .filter(pk__in={
+                record.get('post') for _, record in batch
+            } - {None, ''})
+            .values_list('pk', flat=True)
+        )
+
+        def comment(record):
+            try:
+                post_id = int(record.get('post'))
+            except (TypeError, ValueError):
+                post_id = None
+            if post_id not in post_ids:
+                raise RecordError(f'неизвестный пост {record.get("post")!r}')
+            return Comment(
+                post_id=post_id,
+                author_id=self.user_id(record),
+                text=self.required(record, 'text'),
+                created=self.date(record, 'created'),
+            )
+
+        objs = self.build(batch, comment)
+        Comment.objects.with_dates().bulk_create(objs)
+        return len(objs)
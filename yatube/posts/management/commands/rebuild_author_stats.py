@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import reconcile
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики авторов пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько пользователей пересчитывать за один проход.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = mismatched = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects
+                .filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            mismatched += reconcile(user_ids, fix=not options['check'])
+            checked += len(user_ids)
+            last_id = user_ids[-1]
+        self.stdout.write(
+            f'Проверено пользователей: {checked}, '
+            f'расхождений: {mismatched}'
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько id постов индексировать за один INSERT.',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(
+                'Полнотекстовый индекс доступен только на SQLite.'
+            )
+            return
+        with transaction.atomic():
+            indexed = search.rebuild(options['batch_size'])
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
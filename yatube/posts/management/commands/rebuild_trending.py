@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг обсуждаемых постов. С --backfill сначала '
+        'собирает почасовые счетчики из комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Собрать счетчики заново, например после импорта.',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            trending.backfill()
+        ranked = trending.recompute()
+        self.stdout.write(f'В рейтинге постов: {ranked}')
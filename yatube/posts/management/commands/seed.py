@@ -0,0 +1,190 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+from faker import Faker
+
+from posts import timeline
+from posts.conditional import SITE, touch
+from posts.constants import PULL_AUTHORS_CACHE_KEY
+from posts.models import (
+    Comment, ExplicitDatesQuerySet, Follow, Group, Post, User
+)
+from posts.utils import batches
+
+BATCH_SIZE = 5000
+# Показатель степенного распределения: чем больше, тем сильнее
+# подписчики и посты сосредоточены у небольшого числа авторов.
+SKEW = 1.1
+PERIOD = timedelta(days=365)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'подписками и комментариями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок одного пользователя.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора: одинаковое зерно дает одинаковые данные.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.now = timezone.now()
+
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        # Популярные авторы и пишут больше, и читаются чаще.
+        self.random.shuffle(user_ids)
+        weights = list(accumulate(
+            1 / rank ** SKEW for rank in range(1, len(user_ids) + 1)
+        ))
+        post_ids = self.create_posts(
+            options['posts'], user_ids, weights, group_ids
+        )
+        self.create_follows(options['follows'], user_ids, weights)
+        self.create_comments(options['comments'], user_ids, post_ids)
+        self.rebuild_derived()
+        self.stdout.write(
+            f'Создано: пользователей {len(user_ids)}, групп {len(group_ids)}, '
+            f'постов {len(post_ids)}, подписок {Follow.objects.count()}, '
+            f'комментариев {options["comments"]}'
+        )
+
+    def bulk_create(self, model, objs):
+        # QuerySet без сигналов массовой вставки, производные данные
+        # пересчитываются один раз в rebuild_derived; даты берутся
+        # из объектов. Размер INSERT выбирает бэкенд: в Django 2.2 явный
+        # batch_size не ограничивается лимитом SQLite на число строк
+        # в одном запросе.
+        ExplicitDatesQuerySet(model).with_dates().bulk_create(objs)
+
+    def new_ids(self, model, last_id):
+        return list(
+            model.objects
+            .filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def last_id(self, model):
+        return model.objects.aggregate(last=models.Max('pk'))['last'] or 0
+
+    def random_date(self):
+        return self.now - PERIOD * self.random.random()
+
+    def create_users(self, total):
+        last_id = self.last_id(User)
+        password = make_password(None)
+        users = (
+            User(
+                username=f'{self.fake.user_name()}_{last_id + index}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            )
+            for index in range(1, total + 1)
+        )
+        for batch in batches(users, self.batch_size):
+            self.bulk_create(User, batch)
+        return self.new_ids(User, last_id)
+
+    def create_groups(self, total):
+        last_id = self.last_id(Group)
+        groups = (
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'group-{last_id + index}',
+                description=self.fake.paragraph(),
+            )
+            for index in range(1, total + 1)
+        )
+        self.bulk_create(Group, list(groups))
+        return self.new_ids(Group, last_id)
+
+    def create_posts(self, total, user_ids, weights, group_ids):
+        last_id = self.last_id(Post)
+        for batch in batches(range(total), self.batch_size):
+            authors = self.random.choices(
+                user_ids, cum_weights=weights, k=len(batch)
+            )
+            self.bulk_create(Post, [
+                Post(
+                    text=self.fake.text(max_nb_chars=400),
+                    author_id=author_id,
+                    group_id=(
+                        self.random.choice(group_ids)
+                        if group_ids and self.random.random() < 0.7
+                        else None
+                    ),
+                    pub_date=self.random_date(),
+                )
+                for author_id in authors
+            ])
+        return self.new_ids(Post, last_id)
+
+    def create_follows(self, average, user_ids, weights):
+        follows = (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in set(self.random.choices(
+                user_ids,
+                cum_weights=weights,
+                k=self.random.randint(0, 2 * average),
+            )) - {user_id}
+        )
+        for batch in batches(follows, self.batch_size):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def create_comments(self, total, user_ids, post_ids):
+        if not post_ids:
+            return
+        for batch in batches(range(total), self.batch_size):
+            self.bulk_create(Comment, [
+                Comment(
+                    post_id=self.random.choice(post_ids),
+                    author_id=self.random.choice(user_ids),
+                    text=self.fake.sentence(),
+                    created=self.random_date(),
+                )
+                for _ in batch
+            ])
+
+    def rebuild_derived(self):
+        call_command('rebuild_author_stats', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        cache.delete(PULL_AUTHORS_CACHE_KEY)
+        author_ids = (
+            Follow.objects
+            .order_by()
+            .values_list('author_id', flat=True)
+            .distinct()
+        )
+        for batch in batches(author_ids.iterator(), self.batch_size):
+            timeline.backfill_authors(batch)
+        touch(SITE)
@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+CHUNK_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Нарезает недостающие миниатюры для картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Число процессов; 1 - нарезать в текущем процессе.',
+        )
+
+    def handle(self, *args, **options):
+        images = list(
+            Post.objects
+            .exclude(image='')
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        if options['workers'] > 1:
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            with ProcessPoolExecutor(options['workers']) as pool:
+                done = sum(1 for _ in pool.map(
+                    generate, images, chunksize=CHUNK_SIZE
+                ))
+        else:
+            done = sum(1 for _ in map(generate, images))
+        self.stdout.write(f'Обработано картинок: {done}')
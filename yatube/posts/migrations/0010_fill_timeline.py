@@ -0,0 +1,41 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+TIMELINE_BACKFILL = 1000
+
+
+def fill_timeline(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    for user_id, author_id in Follow.objects.values_list('user', 'author'):
+        posts = (
+            Post.objects
+            .filter(author_id=author_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', 'pub_date')[:TIMELINE_BACKFILL]
+        )
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for post_id, pub_date in posts
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
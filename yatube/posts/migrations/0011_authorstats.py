@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_fill_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('followers', models.PositiveIntegerField(db_index=True, default=0, verbose_name='подписчики')),
+                ('following', models.PositiveIntegerField(default=0, verbose_name='подписки')),
+                ('posts', models.PositiveIntegerField(default=0, verbose_name='посты')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='комментарии')),
+            ],
+            options={
+                'verbose_name': 'статистика автора',
+                'verbose_name_plural': 'статистика авторов',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def fill_authorstats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counters = {
+        user_id: {}
+        for user_id in User.objects.values_list('pk', flat=True)
+    }
+    sources = (
+        ('followers', Follow, 'author'),
+        ('following', Follow, 'user'),
+        ('posts', Post, 'author'),
+        ('comments', Comment, 'author'),
+    )
+    for name, model, field in sources:
+        rows = (
+            model.objects
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values_list(field, 'total')
+        )
+        for user_id, total in rows:
+            counters[user_id][name] = total
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(user_id=user_id, **values)
+            for user_id, values in counters.items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_authorstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_authorstats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+CREATE_TABLE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5('
+    'text, group_id UNINDEXED, author_id UNINDEXED, '
+    'tokenize="unicode61 remove_diacritics 2")'
+)
+FILL_TABLE = (
+    'INSERT INTO posts_post_fts (rowid, text, group_id, author_id) '
+    'SELECT id, text, group_id, author_id FROM posts_post'
+)
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE)
+    schema_editor.execute(FILL_TABLE)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_fill_authorstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:34
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_comment_post_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='файл')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='число ссылок')),
+            ],
+            options={
+                'verbose_name': 'файл картинки',
+                'verbose_name_plural': 'файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_imageblob(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    rows = (
+        Post.objects
+        .exclude(image='')
+        .order_by()
+        .values('image')
+        .annotate(total=Count('pk'))
+        .values_list('image', 'total')
+    )
+    ImageBlob.objects.bulk_create(
+        ImageBlob(name=name, references=total) for name, total in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_imageblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_imageblob, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_fill_imageblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestEntry',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='posts.Post', verbose_name='пост')),
+            ],
+            options={
+                'verbose_name': 'пост для дайджеста',
+                'verbose_name_plural': 'посты для дайджеста',
+            },
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='notify',
+            field=models.BooleanField(default=False, verbose_name='уведомлять о новых постах'),
+        ),
+    ]
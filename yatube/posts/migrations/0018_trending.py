@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('rank', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='место')),
+                ('score', models.FloatField(verbose_name='рейтинг')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trend', to='posts.Post', verbose_name='пост')),
+            ],
+            options={
+                'verbose_name': 'обсуждаемый пост',
+                'verbose_name_plural': 'обсуждаемые посты',
+                'ordering': ('rank',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PostActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True, verbose_name='час')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='комментарии')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='пост')),
+            ],
+            options={
+                'verbose_name': 'активность поста',
+                'verbose_name_plural': 'активность постов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postactivity',
+            constraint=models.UniqueConstraint(fields=('post', 'hour'), name='unique_post_activity'),
+        ),
+    ]
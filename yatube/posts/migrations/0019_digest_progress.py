@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digestentry',
+            name='sent_to',
+            field=models.PositiveIntegerField(default=0, verbose_name='разослано подписчикам до id включительно'),
+        ),
+    ]
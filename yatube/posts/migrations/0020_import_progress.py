@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_digest_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=1024, unique=True, verbose_name='ключ импорта')),
+                ('path', models.CharField(max_length=1024, verbose_name='файл')),
+                ('kind', models.CharField(max_length=20, verbose_name='тип данных')),
+                ('done', models.PositiveIntegerField(default=0, verbose_name='загружено записей')),
+            ],
+            options={
+                'verbose_name': 'прогресс импорта',
+                'verbose_name_plural': 'прогресс импорта',
+            },
+        ),
+    ]
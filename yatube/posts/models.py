@@ -1,6 +1,11 @@
-from django.db import models
+from collections import defaultdict, deque
+
+from django.db import connections, models
 from django.contrib.auth import get_user_model
 
+from .signals import comments_bulk_created, posts_bulk_created
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -13,6 +18,63 @@ class Group(models.Model):
         return self.title
 
 
+class ExplicitDatesQuerySet(models.QuerySet):
+    """QuerySet, который умеет вставлять строки с заданными датами.
+
+    bulk_create копии из with_dates() вставляет строки как loaddata, без
+    pre_save полей: auto_now_add не подменяет даты объектов, а общие
+    для процесса поля модели не меняются.
+    """
+    explicit_dates = False
+
+    def with_dates(self):
+        clone = self.all()
+        clone.explicit_dates = True
+        return clone
+
+    def _insert(self, *args, **kwargs):
+        if self.explicit_dates:
+            kwargs['raw'] = True
+        return super()._insert(*args, **kwargs)
+
+
+class PostQuerySet(ExplicitDatesQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        features = connections[self.db].features
+        last_pk = None
+        if (not features.can_return_ids_from_bulk_insert
+                and any(post.pk is None for post in objs)):
+            last_pk = self.order_by('-pk').values_list('pk', flat=True)
+            last_pk = last_pk.first() or 0
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if last_pk is not None:
+            self._read_new_pks(objs, last_pk)
+        posts_bulk_created.send(sender=self.model, objs=objs)
+        return objs
+
+    def _read_new_pks(self, objs, last_pk):
+        """Находит pk вставленных постов по автору и дате публикации.
+
+        SQLite не возвращает pk из bulk_create. Строки пачки вставляются
+        по порядку, поэтому одинаковые пары (автор, дата) получают pk
+        по возрастанию; посты, которые не нашлись, остаются без pk.
+        """
+        known = {post.pk for post in objs if post.pk is not None}
+        new_pks = defaultdict(deque)
+        rows = (
+            self.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'author_id', 'pub_date')
+        )
+        for pk, author_id, pub_date in rows.iterator():
+            if pk not in known:
+                new_pks[author_id, pub_date].append(pk)
+        for post in objs:
+            if post.pk is None and new_pks[post.author_id, post.pub_date]:
+                post.pk = new_pks[post.author_id, post.pub_date].popleft()
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -31,16 +93,39 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_feed_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
 
+class CommentQuerySet(ExplicitDatesQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        comments_bulk_created.send(sender=self.model, objs=objs)
+        return objs
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -60,10 +145,18 @@ class Comment(models.Model):
         verbose_name='дата публикации'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
-        ordering = ('-created',)
+        ordering = ('-created', '-id')
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -82,6 +175,10 @@ class Follow(models.Model):
         verbose_name='автор',
         related_name='following',
     )
+    notify = models.BooleanField(
+        default=False,
+        verbose_name='уведомлять о новых постах',
+    )
 
     class Meta:
         verbose_name = 'подписки'
@@ -94,3 +191,195 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user.username} подписался на {self.author.username}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='читатель',
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='пост',
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_feed_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user_id}'
+
+
+class DigestEntry(models.Model):
+    """Пост, о котором подписчикам еще не разослан дайджест."""
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='пост',
+        related_name='+',
+    )
+    sent_to = models.PositiveIntegerField(
+        'разослано подписчикам до id включительно', default=0
+    )
+
+    class Meta:
+        verbose_name = 'пост для дайджеста'
+        verbose_name_plural = 'посты для дайджеста'
+
+    def __str__(self):
+        return f'{self.post_id} ждет рассылки'
+
+
+class PostActivity(models.Model):
+    """Число комментариев к посту за час, из него считается рейтинг."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='пост',
+        related_name='+',
+    )
+    hour = models.DateTimeField(db_index=True, verbose_name='час')
+    comments = models.PositiveIntegerField(
+        default=0,
+        verbose_name='комментарии',
+    )
+
+    class Meta:
+        verbose_name = 'активность поста'
+        verbose_name_plural = 'активность постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'hour'], name='unique_post_activity'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} за {self.hour}: {self.comments}'
+
+
+class TrendingPost(models.Model):
+    rank = models.PositiveSmallIntegerField(
+        primary_key=True,
+        verbose_name='место',
+    )
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='пост',
+        related_name='trend',
+    )
+    score = models.FloatField(verbose_name='рейтинг')
+
+    class Meta:
+        verbose_name = 'обсуждаемый пост'
+        verbose_name_plural = 'обсуждаемые посты'
+        ordering = ('rank',)
+
+    def __str__(self):
+        return f'{self.rank}. {self.post_id}'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='пользователь',
+        related_name='stats',
+    )
+    followers = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='подписчики',
+    )
+    following = models.PositiveIntegerField(
+        default=0,
+        verbose_name='подписки',
+    )
+    posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='посты',
+    )
+    comments = models.PositiveIntegerField(
+        default=0,
+        verbose_name='комментарии',
+    )
+
+    class Meta:
+        verbose_name = 'статистика автора'
+        verbose_name_plural = 'статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class ImageBlob(models.Model):
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='файл',
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число ссылок',
+    )
+
+    class Meta:
+        verbose_name = 'файл картинки'
+        verbose_name_plural = 'файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class ImportProgress(models.Model):
+    """Сколько записей файла уже загрузила команда import_data.
+
+    Пишется в транзакции пачки, поэтому после сбоя импорт продолжается
+    ровно с первой незагруженной записи.
+    """
+
+    name = models.CharField(
+        max_length=1024,
+        unique=True,
+        verbose_name='ключ импорта',
+    )
+    path = models.CharField(max_length=1024, verbose_name='файл')
+    kind = models.CharField(max_length=20, verbose_name='тип данных')
+    done = models.PositiveIntegerField(
+        default=0,
+        verbose_name='загружено записей',
+    )
+
+    class Meta:
+        verbose_name = 'прогресс импорта'
+        verbose_name_plural = 'прогресс импорта'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,171 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import authors, digests, images, search, stats, timeline, trending
+from .conditional import INDEX, SITE, touch
+from .fragments import bump_version
+from .models import Comment, Follow, Group, Post, User
+from .signals import comments_bulk_created, posts_bulk_created
+
+
+def touch_posts(posts, *group_ids):
+    """Отмечает изменение страниц, на которых видны посты."""
+    scopes = {INDEX}
+    for post in posts:
+        scopes.add(('author', post.author_id))
+        scopes.add(('post', post.pk))
+        group_ids += (post.group_id,)
+    scopes.update(('group', group_id) for group_id in group_ids if group_id)
+    touch(*(scope for scope in scopes if None not in scope))
+
+
+@receiver(pre_save, sender=Post)
+def remember_stored_post(sender, instance, **kwargs):
+    stored = instance.pk and (
+        Post.objects
+        .filter(pk=instance.pk)
+        .values('image', 'group_id')
+        .first()
+    ) or {}
+    instance._stored_image = stored.get('image') or ''
+    instance._stored_group_id = stored.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    bump_version('post', instance.pk)
+    search.index_post(instance)
+    # Ссылку на новую картинку уже взяло хранилище при записи файла.
+    stored_image = getattr(instance, '_stored_image', '')
+    if instance.image.name != stored_image:
+        images.decref(stored_image)
+    if created:
+        stats.increment(instance.author_id, posts=1)
+        timeline.fan_out(instance)
+        digests.schedule(instance)
+    # При переносе поста меняется и страница прежней группы.
+    touch_posts([instance], getattr(instance, '_stored_group_id', None))
+
+
+@receiver(posts_bulk_created, sender=Post)
+def posts_bulk_created_handler(sender, objs, **kwargs):
+    authors = Counter(post.author_id for post in objs)
+    for author_id, total in authors.items():
+        stats.increment(author_id, posts=total)
+    if all(post.pk for post in objs):
+        timeline.fan_out_many(objs)
+        search.index_ids(post.pk for post in objs)
+    else:
+        # Не у всех постов нашелся pk: досчитываем по авторам.
+        timeline.backfill_authors(authors)
+        search.index_authors(authors)
+    touch_posts(objs)
+
+
+@receiver(comments_bulk_created, sender=Comment)
+def comments_bulk_created_handler(sender, objs, **kwargs):
+    authors = Counter(comment.author_id for comment in objs)
+    for author_id, total in authors.items():
+        stats.increment(author_id, comments=total)
+    trending.record(objs)
+    touch(
+        *(('post', post_id) for post_id in {c.post_id for c in objs}),
+        *(('author', author_id) for author_id in authors),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_version('post', instance.pk)
+    search.unindex_post(instance.pk)
+    images.decref(instance.image.name)
+    stats.decrement(instance.author_id, posts=1)
+    touch_posts([instance])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    bump_version('group', instance.pk)
+    touch(SITE)
+
+
+# Поля пользователя, которые видны на страницах и лежат в кэше авторов.
+SHOWN_USER_FIELDS = tuple(
+    field for field in authors.SUMMARY_FIELDS if field != 'id'
+)
+
+
+@receiver(pre_save, sender=User)
+def remember_stored_user(sender, instance, update_fields=None, **kwargs):
+    instance._stored_user = None
+    if instance.pk and (
+        update_fields is None
+        or set(update_fields) & set(SHOWN_USER_FIELDS)
+    ):
+        instance._stored_user = (
+            User.objects
+            .filter(pk=instance.pk)
+            .values(*SHOWN_USER_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        # Новое имя могло быть закэшировано как несуществующее.
+        authors.forget(instance.username)
+        return
+    stored = getattr(instance, '_stored_user', None)
+    if not stored or all(
+        getattr(instance, field) == stored[field]
+        for field in SHOWN_USER_FIELDS
+    ):
+        # Вход, смена пароля или прав не меняют страниц.
+        return
+    authors.forget(instance.username, stored['username'])
+    # Карточки на чужих страницах сбрасывает версия фрагментов.
+    bump_version('user', instance.pk)
+    touch(('author', instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    authors.forget(instance.username)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, comments=1)
+        trending.record([instance])
+    touch(('post', instance.post_id), ('author', instance.author_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, comments=1)
+    trending.forget(instance)
+    touch(('post', instance.post_id), ('author', instance.author_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, followers=1)
+        stats.increment(instance.user_id, following=1)
+        timeline.refresh_pull_authors(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+        touch(('author', instance.author_id), ('author', instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, followers=1)
+    stats.decrement(instance.user_id, following=1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.refresh_pull_authors(instance.author_id, unfollowed=True)
+    touch(('author', instance.author_id), ('author', instance.user_id))
@@ -0,0 +1,183 @@
+"""Полнотекстовый поиск по Post.text.
+
+На SQLite индекс хранится в виртуальной таблице FTS5, rowid которой
+совпадает с id поста; ранжирование по bm25. На остальных базах поиск
+откатывается к icontains, чтобы endpoint продолжал работать.
+"""
+import re
+
+from django.db import connection, connections, router
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    'text, group_id UNINDEXED, author_id UNINDEXED, '
+    'tokenize="unicode61 remove_diacritics 2")'
+)
+INSERT_SELECT = (
+    f'INSERT INTO {TABLE} (rowid, text, group_id, author_id) '
+    'SELECT id, text, group_id, author_id FROM posts_post '
+)
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    terms = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def index_post(post):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, group_id, author_id) '
+            'VALUES (%s, %s, %s, %s)',
+            [post.pk, post.text, post.group_id, post.author_id],
+        )
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def index_authors(author_ids):
+    """Индексирует посты авторов, которых еще нет в индексе.
+
+    Нужен для bulk_create: на SQLite созданные объекты не получают pk.
+    """
+    author_ids = list(author_ids)
+    if not is_supported() or not author_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            INSERT_SELECT
+            + f'WHERE author_id IN ({placeholders}) '
+            f'AND id NOT IN (SELECT rowid FROM {TABLE})',
+            author_ids,
+        )
+
+
+def index_ids(post_ids, batch_size=500):
+    """Индексирует посты с известными id, например после импорта."""
+    post_ids = list(post_ids)
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(post_ids), batch_size):
+            batch = post_ids[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', batch
+            )
+            cursor.execute(
+                INSERT_SELECT + f'WHERE id IN ({placeholders})', batch
+            )
+
+
+def rebuild(batch_size):
+    """Перестраивает индекс диапазонами id, возвращает число постов."""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute('SELECT MAX(id) FROM posts_post')
+        last_id = cursor.fetchone()[0] or 0
+        for start in range(0, last_id, batch_size):
+            cursor.execute(
+                INSERT_SELECT + 'WHERE id > %s AND id <= %s',
+                [start, start + batch_size],
+            )
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def search_ids(query, group_id=None, author_id=None, offset=0, limit=10):
+    """Возвращает id постов, отсортированные по релевантности."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if not is_supported():
+        posts = Post.objects.filter(text__icontains=query)
+        if group_id:
+            posts = posts.filter(group_id=group_id)
+        if author_id:
+            posts = posts.filter(author_id=author_id)
+        return list(
+            posts.values_list('pk', flat=True)[offset:offset + limit]
+        )
+    sql = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [expression]
+    if group_id:
+        sql += ' AND group_id = %s'
+        params.append(group_id)
+    if author_id:
+        sql += ' AND author_id = %s'
+        params.append(author_id)
+    sql += f' ORDER BY bm25({TABLE}) LIMIT %s OFFSET %s'
+    params += [limit, offset]
+    with connections[router.db_for_read(Post)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SearchPage:
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def search_posts(query, per_page, number=1, group=None, author=None):
+    ids = search_ids(
+        query,
+        group_id=group.pk if group else None,
+        author_id=author.pk if author else None,
+        offset=(number - 1) * per_page,
+        limit=per_page + 1,
+    )
+    posts = (
+        Post.objects
+        .select_related('author', 'group')
+        .in_bulk(ids[:per_page])
+    )
+    return SearchPage(
+        [posts[pk] for pk in ids[:per_page] if pk in posts],
+        number,
+        has_next=len(ids) > per_page,
+    )
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# bulk_create не отправляет post_save, поэтому PostQuerySet и
+# CommentQuerySet сообщают о массовой вставке отдельно: аргумент objs -
+# созданные объекты.
+posts_bulk_created = Signal()
+comments_bulk_created = Signal()
@@ -0,0 +1,79 @@
+"""Денормализованные счетчики автора для страницы профиля."""
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+COUNTERS = ('followers', 'following', 'posts', 'comments')
+SOURCES = (
+    ('followers', Follow, 'author'),
+    ('following', Follow, 'user'),
+    ('posts', Post, 'author'),
+    ('comments', Comment, 'author'),
+)
+
+
+def count(user_ids):
+    counters = {user_id: dict.fromkeys(COUNTERS, 0) for user_id in user_ids}
+    for name, model, field in SOURCES:
+        rows = (
+            model.objects
+            .filter(**{f'{field}__in': user_ids})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values_list(field, 'total')
+        )
+        for user_id, total in rows:
+            counters[user_id][name] = total
+    return counters
+
+
+def increment(user_id, **deltas):
+    """Увеличивает счетчики; отсутствующая запись создается пересчетом."""
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id, defaults=count([user_id])[user_id]
+        )
+
+
+def decrement(user_id, **deltas):
+    # Записи не создаются: при каскадном удалении пользователя
+    # post_delete приходит уже после удаления его статистики.
+    AuthorStats.objects.filter(user_id=user_id).update(**{
+        name: Greatest(F(name) - delta, Value(0))
+        for name, delta in deltas.items()
+    })
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user_id=user.pk, defaults=count([user.pk])[user.pk]
+        )
+        return stats
+
+
+def reconcile(user_ids, fix=True):
+    """Сверяет счетчики пачки пользователей, возвращает число расхождений."""
+    actual = count(user_ids)
+    stored = AuthorStats.objects.in_bulk(user_ids)
+    missing, drifted = [], []
+    for user_id, counters in actual.items():
+        stats = stored.get(user_id)
+        if stats is None:
+            missing.append(AuthorStats(user_id=user_id, **counters))
+            continue
+        if any(getattr(stats, name) != counters[name] for name in COUNTERS):
+            for name in COUNTERS:
+                setattr(stats, name, counters[name])
+            drifted.append(stats)
+    if fix:
+        AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
+        AuthorStats.objects.bulk_update(drifted, COUNTERS)
+    return len(missing) + len(drifted)
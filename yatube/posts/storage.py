@@ -0,0 +1,67 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем sha256 содержимого.
+
+    Файл пишется во временный файл с подсчетом хеша на лету и затем
+    атомарно переносится в <upload_to>/ab/cd/<hash><ext>. Если такой
+    файл уже есть, повторная запись не выполняется.
+
+    Ссылку на файл в ImageBlob берет само хранилище до проверки, есть
+    ли файл: иначе параллельное удаление последней ссылки могло бы
+    стереть файл, который только что решили переиспользовать.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.upload')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            name = content_name(directory, digest.hexdigest(), extension)
+            full_path = self.path(name)
+            # Модуль images импортирует модели, а модели - это хранилище.
+            from .images import incref
+            with transaction.atomic():
+                incref(name)
+                if os.path.exists(full_path):
+                    os.remove(tmp_path)
+                    return name
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+def content_name(directory, hexdigest, extension):
+    return '/'.join(filter(None, (
+        directory,
+        hexdigest[:2],
+        hexdigest[2:4],
+        f'{hexdigest}{extension}',
+    )))
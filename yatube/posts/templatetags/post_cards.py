@@ -0,0 +1,11 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.fragments import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, skip_author_info=False, skip_group_info=False):
+    return mark_safe(render_cards(posts, skip_author_info, skip_group_info))
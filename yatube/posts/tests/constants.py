@@ -1,3 +1,4 @@
+import hashlib
 import tempfile
 from http import HTTPStatus
 from django.conf import settings
@@ -12,16 +13,25 @@ TEST_SLUG_2 = 'test_slug_2'
 TEST_NAME = 'test_name'
 TEST_NAME_2 = 'test_name_2'
 INDEX = reverse('posts:index')
+SEARCH = reverse('posts:search')
+TRENDING = reverse('posts:trending')
 POST_CREATE = reverse('posts:post_create')
 GROUP_LIST = reverse('posts:group_list', args=[TEST_SLUG])
 GROUP_LIST_2 = reverse('posts:group_list', args=[TEST_SLUG_2])
 PROFILE = reverse('posts:profile', args=[TEST_NAME])
+PROFILE_EXPORT = reverse('posts:profile_export', args=[TEST_NAME])
+GROUP_EXPORT = reverse('posts:group_export', args=[TEST_SLUG])
+INDEX_RSS = reverse('posts:index_rss')
+GROUP_ATOM = reverse('posts:group_atom', args=[TEST_SLUG])
+PROFILE_RSS = reverse('posts:profile_rss', args=[TEST_NAME])
 LOGIN = reverse('users:login')
 NEXT = '?next='
 FOLLOW = reverse('posts:follow_index')
 FOLLOW_USER = reverse('posts:profile_follow', args=[TEST_NAME])
 FOLLOW_USER_AUTHOR = reverse('posts:profile_follow', args=[TEST_NAME_2])
 UNFOLLOW_USER = reverse('posts:profile_unfollow', args=[TEST_NAME])
+NOTIFY_USER = reverse('posts:profile_notify', args=[TEST_NAME])
+MUTE_USER = reverse('posts:profile_mute', args=[TEST_NAME])
 REDIRECT_POST_CREATE = f'{LOGIN}{NEXT}{POST_CREATE}'
 REDIRECT_LOGIN_FOLLOW = f'{LOGIN}{NEXT}{FOLLOW_USER}'
 REDIRECT_LOGIN_UNFOLLOW = f'{LOGIN}{NEXT}{UNFOLLOW_USER}'
@@ -30,6 +40,7 @@ UNEXISTING_PAGE = '/unexisting_page/'
 OK = HTTPStatus.OK
 REDIRECT = HTTPStatus.FOUND
 NOT_FOUND = HTTPStatus.NOT_FOUND
+NOT_MODIFIED = HTTPStatus.NOT_MODIFIED
 IMAGE_CONTENT = (
     b'\x47\x49\x46\x38\x39\x61\x02\x00'
     b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -49,4 +60,8 @@ TEST_IMAGE_2 = SimpleUploadedFile(
     content_type='image/png',
 )
 IMAGE_FOLDER = Post._meta.get_field("image").upload_to
+IMAGE_HASH = hashlib.sha256(IMAGE_CONTENT).hexdigest()
+IMAGE_NAME = (
+    f'{IMAGE_FOLDER}{IMAGE_HASH[:2]}/{IMAGE_HASH[2:4]}/{IMAGE_HASH}.png'
+)
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
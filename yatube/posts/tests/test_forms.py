@@ -1,11 +1,15 @@
+import json
 import shutil
+from unittest import mock
 
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django import forms
 
+from core.models import Job
 
-from ..models import Post, Group, User, Comment
+from ..models import Post, Group, User, Comment, ImageBlob
 from .constants import (
     TEST_SLUG,
     TEST_SLUG_2,
@@ -18,7 +22,8 @@ from .constants import (
     REDIRECT_POST_CREATE,
     TEST_IMAGE,
     TEST_IMAGE_2,
-    IMAGE_FOLDER,
+    IMAGE_CONTENT,
+    IMAGE_NAME,
     TEMP_MEDIA_ROOT
 )
 
@@ -80,10 +85,7 @@ class PostFormsTest(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group_id, form_data['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(
-            post.image.name,
-            f'{IMAGE_FOLDER}{form_data["image"].name}'
-        )
+        self.assertEqual(post.image.name, IMAGE_NAME)
 
     def test_edit_post(self):
         """Валидная форма редактирует запись в БД."""
@@ -104,10 +106,7 @@ class PostFormsTest(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group_id, form_data['group'])
         self.assertEqual(post.author, self.post.author)
-        self.assertEqual(
-            post.image.name,
-            f'{IMAGE_FOLDER}{form_data["image"].name}'
-        )
+        self.assertEqual(post.image.name, IMAGE_NAME)
 
     def test_create_post_page_show_correct_context(self):
         """Шаблон create_post для создания и редактирования поста сформирован
@@ -193,3 +192,78 @@ class PostFormsTest(TestCase):
                 self.assertEqual(post.group, self.post.group)
                 self.assertEqual(post.author, self.post.author)
                 self.assertEqual(post.image, self.post.image)
+
+    def test_thumbnails_scheduled_after_save(self):
+        """После сохранения картинки миниатюры ставятся в очередь
+        фоновых задач, а не режутся в запросе."""
+        form_data = {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                name='thumb.gif',
+                content=IMAGE_CONTENT,
+                content_type='image/gif',
+            ),
+        }
+        self.authorized_client.post(POST_CREATE, data=form_data)
+        self.authorized_client.post(
+            self.POST_EDIT, data={'text': 'Без новой картинки'}
+        )
+        queued = Job.objects.filter(name='posts.thumbnails.generate')
+        self.assertEqual(queued.count(), 1)
+        self.assertEqual(
+            json.loads(queued.get().args),
+            [Post.objects.get(text='Пост с картинкой').image.name],
+        )
+
+    def test_same_images_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом, который удаляется
+        вместе с последним ссылающимся на него постом."""
+        posts = [
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост {i}',
+                image=SimpleUploadedFile(
+                    name=f'copy_{i}.png',
+                    content=IMAGE_CONTENT,
+                    content_type='image/png',
+                ),
+            )
+            for i in range(2)
+        ]
+        storage = Post._meta.get_field('image').storage
+        self.assertEqual(posts[0].image.name, posts[1].image.name)
+        self.assertEqual(
+            ImageBlob.objects.get(name=IMAGE_NAME).references, 2
+        )
+        with mock.patch('posts.images.transaction.on_commit') as hook:
+            hook.side_effect = lambda callback: callback()
+            posts[0].delete()
+            self.assertTrue(storage.exists(IMAGE_NAME))
+            posts[1].delete()
+        self.assertFalse(ImageBlob.objects.filter(name=IMAGE_NAME).exists())
+        self.assertFalse(storage.exists(IMAGE_NAME))
+
+    def test_reused_image_survives_concurrent_collect(self):
+        """Файл, который хранилище решило переиспользовать, не стирает
+        отложенное удаление последней прежней ссылки."""
+        post = Post.objects.create(
+            author=self.user,
+            text='Старый пост',
+            image=SimpleUploadedFile(
+                name='old.png', content=IMAGE_CONTENT, content_type='image/png'
+            ),
+        )
+        storage = Post._meta.get_field('image').storage
+        with mock.patch('posts.images.transaction.on_commit') as hook:
+            post.delete()
+        (delete_file,), _ = hook.call_args
+        # Между коммитом удаления и стиранием файла пришла та же картинка.
+        name = storage.save(
+            'posts/new.png', SimpleUploadedFile('new.png', IMAGE_CONTENT)
+        )
+        delete_file()
+        self.assertEqual(name, IMAGE_NAME)
+        self.assertTrue(storage.exists(IMAGE_NAME))
+        self.assertEqual(
+            ImageBlob.objects.get(name=IMAGE_NAME).references, 1
+        )
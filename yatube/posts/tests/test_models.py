@@ -1,6 +1,20 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-from ..models import Group, Post, User, Comment, Follow
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from ..models import (
+    AuthorStats, Group, ImageBlob, ImportProgress, Post, User, Comment,
+    Follow, TimelineEntry
+)
+from ..search import search_ids
+from .constants import IMAGE_CONTENT, IMAGE_NAME, TEMP_MEDIA_ROOT
 
 
 class PostModelTest(TestCase):
@@ -38,3 +52,153 @@ class PostModelTest(TestCase):
             f'{self.subscription.user.username} подписался на '
             f'{self.subscription.author.username}',
             str(self.subscription))
+
+    def test_author_stats_follow_changes(self):
+        """Счетчики автора меняются вместе с постами, комментариями
+        и подписками."""
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (1, 0, 1, 1)
+        )
+        post = Post.objects.create(author=self.user, text='Еще пост')
+        Comment.objects.create(post=post, author=self.user, text='Еще')
+        Follow.objects.create(user=self.user, author=self.user_2)
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (1, 1, 2, 2)
+        )
+        post.delete()
+        Follow.objects.filter(user=self.user).delete()
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (1, 0, 1, 1)
+        )
+
+    def test_rebuild_author_stats_command(self):
+        """Команда rebuild_author_stats восстанавливает счетчики."""
+        AuthorStats.objects.filter(user=self.user).update(posts=100)
+        AuthorStats.objects.filter(user=self.user_2).delete()
+        out = StringIO()
+        call_command('rebuild_author_stats', '--check', stdout=out)
+        self.assertIn('расхождений: 2', out.getvalue())
+        call_command('rebuild_author_stats', batch_size=1, stdout=out)
+        self.assertEqual(AuthorStats.objects.get(user=self.user).posts, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user_2).following, 1
+        )
+
+    def test_seed_command(self):
+        """Команда seed создает данные и согласованные счетчики."""
+        call_command(
+            'seed', users=30, groups=3, posts=200, comments=100,
+            follows=5, batch_size=50, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 201)
+        self.assertEqual(Comment.objects.count(), 101)
+        self.assertGreater(Post.objects.dates('pub_date', 'day').count(), 1)
+        out = StringIO()
+        call_command('rebuild_author_stats', '--check', stdout=out)
+        self.assertIn('расхождений: 0', out.getvalue())
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_import_data_command(self):
+        """Команда import_data загружает данные и обновляет производные."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        with open(os.path.join(directory, 'pic.png'), 'wb') as image:
+            image.write(IMAGE_CONTENT)
+        groups = os.path.join(directory, 'groups.csv')
+        with open(groups, 'w', encoding='utf-8') as source:
+            source.write('slug,title,description\nimported,Импорт,\n')
+        posts = os.path.join(directory, 'posts.jsonl')
+        with open(posts, 'w', encoding='utf-8') as source:
+            for record in (
+                {'id': 500, 'text': 'Старый пост', 'author': 'auth'},
+                {'id': 501, 'text': 'Импортированный пингвин',
+                 'author': 'auth', 'group': 'imported',
+                 'pub_date': '2020-01-02T03:04:05', 'image': 'pic.png'},
+                {'id': 502, 'text': 'Без автора'},
+                {'id': 503, 'text': 'Новый автор', 'author': 'newcomer'},
+                {'text': 'Безымянный тюлень', 'author': 'auth_2'},
+                {'id': 501, 'text': 'Повтор', 'author': 'auth'},
+            ):
+                source.write(json.dumps(record, ensure_ascii=False) + '\n')
+        comments = os.path.join(directory, 'comments.jsonl')
+        with open(comments, 'w', encoding='utf-8') as source:
+            source.write('{"post": 501, "author": "auth_2", "text": "Ок"}\n')
+            source.write('{"post": 999, "author": "auth_2", "text": "Нет"}\n')
+        # Первая запись постов уже загружена прерванным запуском.
+        ImportProgress.objects.create(
+            name=posts, path=posts, kind='posts', done=1
+        )
+        err = StringIO()
+        call_command('import_data', groups, kind='groups', stdout=StringIO())
+        # Уже существующие группы не считаются импортированными.
+        out = StringIO()
+        call_command('import_data', groups, kind='groups', stdout=out)
+        self.assertIn('Импортировано: 0', out.getvalue())
+        call_command(
+            'import_data', posts, kind='posts', images=directory,
+            create_users=True, batch_size=2, stdout=StringIO(), stderr=err,
+        )
+        call_command(
+            'import_data', comments, kind='comments',
+            stdout=StringIO(), stderr=err,
+        )
+        self.assertFalse(ImportProgress.objects.exists())
+        self.assertFalse(Post.objects.filter(pk=500).exists())
+        self.assertFalse(Post.objects.filter(pk=502).exists())
+        self.assertIn('Запись 3: неизвестный автор None', err.getvalue())
+        self.assertIn('Запись 6: пост с id 501 уже есть', err.getvalue())
+        self.assertIn("Запись 2: неизвестный пост 999", err.getvalue())
+        post = Post.objects.get(pk=501)
+        self.assertEqual(post.group.slug, 'imported')
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.image.name, IMAGE_NAME)
+        self.assertEqual(ImageBlob.objects.get(name=IMAGE_NAME).references, 1)
+        self.assertEqual(post.comments.count(), 1)
+        self.assertEqual(
+            Post.objects.get(pk=503).author.username, 'newcomer'
+        )
+        self.assertEqual(search_ids('пингвин'), [501])
+        unnamed = Post.objects.get(text='Безымянный тюлень')
+        self.assertEqual(search_ids('тюлень'), [unnamed.pk])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user_2, post=post).exists()
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).posts, 2
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user_2).comments, 1
+        )
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_import_data_removes_images_of_rolled_back_batch(self):
+        """Откат пачки import_data удаляет уже сохраненные картинки."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        with open(os.path.join(directory, 'pic.png'), 'wb') as image:
+            image.write(IMAGE_CONTENT)
+        posts = os.path.join(directory, 'posts.jsonl')
+        with open(posts, 'w', encoding='utf-8') as source:
+            source.write(json.dumps(
+                {'text': 'С картинкой', 'author': 'auth', 'image': 'pic.png'}
+            ) + '\n')
+        with mock.patch(
+            'posts.models.PostQuerySet.bulk_create',
+            side_effect=DatabaseError('сбой'),
+        ):
+            with self.assertRaises(DatabaseError):
+                call_command(
+                    'import_data', posts, kind='posts', images=directory,
+                    stdout=StringIO(),
+                )
+        storage = Post._meta.get_field('image').storage
+        self.assertFalse(storage.exists(IMAGE_NAME))
+        self.assertFalse(ImageBlob.objects.filter(name=IMAGE_NAME).exists())
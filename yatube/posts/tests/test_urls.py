@@ -9,12 +9,18 @@ from .constants import (
     TEST_NAME,
     TEST_NAME_2,
     INDEX,
+    SEARCH,
     FOLLOW,
     FOLLOW_USER,
     UNFOLLOW_USER,
     POST_CREATE,
     GROUP_LIST,
+    GROUP_EXPORT,
+    GROUP_ATOM,
+    INDEX_RSS,
     PROFILE,
+    PROFILE_RSS,
+    PROFILE_EXPORT,
     LOGIN,
     NEXT,
     REDIRECT_POST_CREATE,
@@ -46,6 +52,9 @@ class PostURLTest(TestCase):
         )
         cls.POST_DETAIL = reverse('posts:post_detail', args=[cls.post.id])
         cls.POST_EDIT = reverse('posts:post_edit', args=[cls.post.id])
+        cls.POST_COMMENTS = reverse(
+            'posts:post_comments', args=[cls.post.id]
+        )
         cls.REDIRECT_LOGIN_POST_EDIT = f'{LOGIN}{NEXT}{cls.POST_EDIT}'
         cls.author = Client()
         cls.author.force_login(cls.user)
@@ -57,6 +66,7 @@ class PostURLTest(TestCase):
         правами доступа."""
         pages_response = [
             [INDEX, self.client, OK],
+            [SEARCH, self.client, OK],
             [GROUP_LIST, self.client, OK],
             [PROFILE, self.client, OK],
             [self.POST_DETAIL, self.client, OK],
@@ -64,6 +74,8 @@ class PostURLTest(TestCase):
             [POST_CREATE, self.client, REDIRECT],
             [UNEXISTING_PAGE, self.client, NOT_FOUND],
             [self.POST_EDIT, self.author, OK],
+            [self.POST_COMMENTS, self.client, REDIRECT],
+            [self.POST_COMMENTS, self.another_author, OK],
             [POST_CREATE, self.author, OK],
             [self.POST_EDIT, self.another_author, REDIRECT],
             [FOLLOW, self.client, REDIRECT],
@@ -74,6 +86,14 @@ class PostURLTest(TestCase):
             [UNFOLLOW_USER, self.client, REDIRECT],
             [UNFOLLOW_USER, self.another_author, REDIRECT],
             [UNFOLLOW_USER, self.author, REDIRECT],
+            [PROFILE_EXPORT, self.client, REDIRECT],
+            [PROFILE_EXPORT, self.another_author, REDIRECT],
+            [PROFILE_EXPORT, self.author, OK],
+            [GROUP_EXPORT, self.author, REDIRECT],
+            [INDEX_RSS, self.client, OK],
+            [GROUP_ATOM, self.client, OK],
+            [PROFILE_RSS, self.client, OK],
+            ['/group/unexisting/rss/', self.client, NOT_FOUND],
         ]
         for url, client, http in pages_response:
             with self.subTest(url=url, client=get_user(client).username):
@@ -91,6 +111,8 @@ class PostURLTest(TestCase):
             [FOLLOW_USER, self.another_author, PROFILE],
             [UNFOLLOW_USER, self.another_author, PROFILE],
             [FOLLOW_USER, self.author, PROFILE],
+            [PROFILE_EXPORT, self.another_author, PROFILE],
+            [GROUP_EXPORT, self.author, GROUP_LIST],
         ]
         for url, client, redirect in pages_redirect:
             with self.subTest(url=url, client=get_user(client).username):
@@ -101,6 +123,7 @@ class PostURLTest(TestCase):
         cache.clear()
         templates_url_names = {
             INDEX: 'posts/index.html',
+            SEARCH: 'posts/search.html',
             GROUP_LIST: 'posts/group_list.html',
             PROFILE: 'posts/profile.html',
             self.POST_DETAIL: 'posts/post_detail.html',
@@ -1,22 +1,66 @@
+import io
+import json
+import os
 import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
 from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Post, Group, User, Follow
-from ..constants import AMOUNT_OF_PUBLICATIONS
+from core.models import Job
+from .. import digests, trending
+from ..fragments import fragment_stats
+from ..models import (
+    Comment,
+    DigestEntry,
+    Follow,
+    Group,
+    Post,
+    PostActivity,
+    TimelineEntry,
+    User,
+)
+from ..constants import (
+    AMOUNT_OF_COMMENTS,
+    AMOUNT_OF_PUBLICATIONS,
+    PAGE_WINDOW,
+)
 from .constants import (
     TEST_SLUG,
     TEST_SLUG_2,
     TEST_NAME,
     TEST_NAME_2,
     INDEX,
+    SEARCH,
+    TRENDING,
     FOLLOW,
     GROUP_LIST,
     GROUP_LIST_2,
+    GROUP_EXPORT,
+    GROUP_ATOM,
+    INDEX_RSS,
+    FOLLOW_USER,
     FOLLOW_USER_AUTHOR,
     UNFOLLOW_USER,
+    NOTIFY_USER,
+    MUTE_USER,
     PROFILE,
+    PROFILE_EXPORT,
+    NOT_FOUND,
+    NOT_MODIFIED,
+    OK,
     TEST_IMAGE,
     TEMP_MEDIA_ROOT
 )
@@ -99,6 +143,16 @@ class PostViewsTest(TestCase):
         author = response.context['author']
         self.assertEqual(author, self.user)
 
+    def test_profile_stats_display(self):
+        """Счетчики профиля берутся из одной записи статистики."""
+        response = self.authorized_user.get(PROFILE)
+        stats = response.context['stats']
+        self.assertEqual(stats.user_id, self.user.id)
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (1, 0, 1, 0)
+        )
+
     def test_group_group_list_display(self):
         """Группа появляется в контексте групп-ленты
         без искажения атрибутов."""
@@ -137,6 +191,53 @@ class PostViewsTest(TestCase):
                 response = self.authorized_user_2.get(page)
                 self.assertEqual(len(response.context['page_obj']), num_posts)
 
+    def test_cursor_pagination(self):
+        """Курсорная пагинация листает ленту вперед и назад без
+        пропусков и повторов."""
+        Post.objects.all().delete()
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=f'Пост {i}')
+            for i in range(AMOUNT_OF_PUBLICATIONS * 2 + 1)
+        )
+        expected = list(Post.objects.values_list('id', flat=True))
+        for url in (INDEX, GROUP_LIST, PROFILE, FOLLOW):
+            with self.subTest(url=url):
+                seen = []
+                page = self.authorized_user_2.get(url).context['page_obj']
+                self.assertFalse(page.has_previous())
+                seen += [post.id for post in page]
+                while page.has_next():
+                    page = self.authorized_user_2.get(
+                        url, {'cursor': page.next_cursor}
+                    ).context['page_obj']
+                    seen += [post.id for post in page]
+                self.assertEqual(seen, expected)
+                page = self.authorized_user_2.get(
+                    url, {'cursor': page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in page],
+                    expected[AMOUNT_OF_PUBLICATIONS:AMOUNT_OF_PUBLICATIONS * 2]
+                )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор отдает первую страницу ленты."""
+        response = self.authorized_user.get(INDEX, {'cursor': 'broken'})
+        self.assertEqual(response.context['page_obj'][0], self.post)
+
+    def test_page_window_is_bounded(self):
+        """Нумерованная пагинация выводит ограниченное окно страниц."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}')
+            for i in range(AMOUNT_OF_PUBLICATIONS * PAGE_WINDOW * 4)
+        )
+        response = self.authorized_user.get(INDEX, {'page': 1})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj.page_window), [1, 2, 3, 4])
+        self.assertNotContains(
+            response, f'?page={page_obj.paginator.num_pages - 1}"'
+        )
+
     def test_cache_index_page(self):
         """При удалении поста он останется в response.content /index/,
         пока не отчистить кэш принудительно."""
@@ -174,3 +275,536 @@ class PostViewsTest(TestCase):
                 author=self.user
             ).exists()
         )
+
+    def test_follow_notifications_are_sent_in_digests(self):
+        """Подписчики с уведомлениями получают по одному письму
+        обо всех новых постах автора за окно."""
+        Post.objects.create(author=self.user_2, text='Без подписчиков')
+        self.assertFalse(DigestEntry.objects.exists())
+
+        self.authorized_user_2.get(NOTIFY_USER)
+        self.assertContains(
+            self.authorized_user_2.get(PROFILE), 'Не уведомлять'
+        )
+        User.objects.filter(pk=self.user_2.pk).update(
+            email='reader@example.com'
+        )
+        reader = User.objects.create_user(
+            username='reader', email='other@example.com'
+        )
+        Follow.objects.create(user=reader, author=self.user, notify=True)
+        silent = User.objects.create_user(
+            username='silent', email='silent@example.com'
+        )
+        Follow.objects.create(user=silent, author=self.user)
+        for text in ('Первая новость', 'Вторая новость'):
+            Post.objects.create(author=self.user, text=text)
+        self.assertEqual(DigestEntry.objects.count(), 2)
+        self.assertEqual(
+            Job.objects.filter(name='posts.digests.send_digests').count(), 1
+        )
+
+        mail.outbox.clear()
+        with mock.patch(
+            'posts.digests.render_to_string',
+            wraps=digests.render_to_string,
+        ) as render:
+            digests.send_digests()
+        # Тема и текст рендерятся один раз на набор постов.
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['other@example.com', 'reader@example.com'],
+        )
+        for message in mail.outbox:
+            self.assertIn('Первая новость', message.body)
+            self.assertIn('Вторая новость', message.body)
+        self.assertFalse(DigestEntry.objects.exists())
+
+        self.authorized_user_2.get(MUTE_USER)
+        self.assertFalse(
+            Follow.objects.get(user=self.user_2, author=self.user).notify
+        )
+
+    def test_failed_digest_run_does_not_mail_twice(self):
+        """Повтор упавшей рассылки не шлет дайджест повторно."""
+        readers = [
+            User.objects.create_user(
+                username=f'reader_{index}', email=f'{index}@example.com'
+            )
+            for index in range(2)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.user, notify=True)
+            Follow.objects.create(
+                user=reader, author=self.user_2, notify=True
+            )
+        Post.objects.create(author=self.user, text='Первая новость')
+        Post.objects.create(author=self.user_2, text='Вторая новость')
+        mail.outbox.clear()
+        backend = mail.get_connection().__class__
+        send_messages = backend.send_messages
+
+        def fail_second_batch(connection, messages):
+            if mail.outbox:
+                raise ConnectionError('Почта недоступна')
+            return send_messages(connection, messages)
+
+        with mock.patch('posts.digests.DIGEST_BATCH_SIZE', 1):
+            with mock.patch.object(
+                backend, 'send_messages', fail_second_batch
+            ):
+                with self.assertRaises(ConnectionError):
+                    digests.send_digests()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(DigestEntry.objects.count(), 2)
+
+        digests.send_digests()
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['0@example.com', '1@example.com'],
+        )
+        # Посты обоих авторов приходят одним письмом.
+        for message in mail.outbox:
+            self.assertIn('Первая новость', message.body)
+            self.assertIn('Вторая новость', message.body)
+        self.assertFalse(DigestEntry.objects.exists())
+
+    def test_trending_ranks_recent_discussions(self):
+        """Обсуждаемое ранжирует посты по свежим комментариям."""
+        busy = Post.objects.create(author=self.user_2, text='Спорный пост')
+        quiet = Post.objects.create(author=self.user_2, text='Тихий пост')
+        for post, total in ((busy, 3), (quiet, 1)):
+            for number in range(total):
+                Comment.objects.create(
+                    post=post, author=self.user, text=f'Ответ {number}'
+                )
+        # Старое обсуждение затухло: 5 комментариев 30 часов назад.
+        PostActivity.objects.create(
+            post=self.post,
+            hour=trending.hour_of(timezone.now() - timedelta(hours=30)),
+            comments=5,
+        )
+        self.assertEqual(
+            PostActivity.objects.get(post=busy).comments, 3
+        )
+        self.assertEqual(
+            Job.objects.filter(name='posts.trending.recompute').count(), 1
+        )
+        self.assertEqual(
+            list(self.client.get(TRENDING).context['page_obj']), []
+        )
+
+        trending.recompute()
+        response = self.client.get(TRENDING)
+        self.assertEqual(
+            list(response.context['page_obj']), [busy, quiet, self.post]
+        )
+
+        # Пока рейтинг не пуст, пересчет повторяется и без комментариев.
+        cache.clear()
+        Job.objects.all().delete()
+        trending.recompute()
+        self.assertEqual(
+            Job.objects.filter(name='posts.trending.recompute').count(), 1
+        )
+
+        cache.clear()
+        Job.objects.all().delete()
+        Comment.objects.filter(post=busy).first().delete()
+        self.assertEqual(
+            PostActivity.objects.get(post=busy).comments, 2
+        )
+        self.assertEqual(
+            Job.objects.filter(name='posts.trending.recompute').count(), 1
+        )
+        out = io.StringIO()
+        call_command('rebuild_trending', backfill=True, stdout=out)
+        self.assertIn('В рейтинге постов: 2', out.getvalue())
+        self.assertEqual(
+            list(self.client.get(TRENDING).context['page_obj']),
+            [busy, quiet],
+        )
+
+        # Обсуждения вышли из окна: рейтинг пустеет, пересчет не ставится.
+        PostActivity.objects.update(
+            hour=trending.hour_of(
+                timezone.now()
+                - timedelta(hours=trending.TRENDING_WINDOW_HOURS + 1)
+            )
+        )
+        cache.clear()
+        Job.objects.all().delete()
+        trending.recompute()
+        self.assertEqual(
+            list(self.client.get(TRENDING).context['page_obj']), []
+        )
+        self.assertFalse(Job.objects.exists())
+
+    def test_timeline_follows_subscriptions(self):
+        """Новый пост попадает в ленты подписчиков, отписка убирает
+        посты автора из ленты, повторная подписка возвращает их."""
+        post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user_2, post=post).exists()
+        )
+        self.authorized_user_2.get(UNFOLLOW_USER)
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=self.user_2, author=self.user
+            ).exists()
+        )
+        self.authorized_user_2.get(FOLLOW_USER)
+        response = self.authorized_user_2.get(FOLLOW)
+        self.assertEqual(
+            list(response.context['page_obj']), [post, self.post]
+        )
+
+    def test_timeline_pull_path(self):
+        """Посты авторов с большим числом подписчиков не раскладываются
+        по лентам, а подмешиваются при чтении."""
+        cache.clear()
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 0):
+            post = Post.objects.create(author=self.user, text='Новый пост')
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            response = self.authorized_user_2.get(FOLLOW)
+        cache.clear()
+        self.assertEqual(
+            list(response.context['page_obj']), [post, self.post]
+        )
+
+    def test_timeline_backfilled_when_author_leaves_pull_mode(self):
+        """Когда автор возвращается из pull в push, посты, вышедшие
+        в режиме pull, раскладываются по лентам подписчиков."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        cache.clear()
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 1):
+            post = Post.objects.create(author=self.user, text='В режиме pull')
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            self.authorized_user_2.get(UNFOLLOW_USER)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+        cache.clear()
+        response = Client()
+        response.force_login(reader)
+        self.assertEqual(
+            list(response.get(FOLLOW).context['page_obj']),
+            [post, self.post],
+        )
+
+    def test_post_cards_are_cached_by_version(self):
+        """Карточки постов берутся из кэша, пока не изменится пост,
+        группа или имя автора."""
+        cache.clear()
+        self.authorized_user.get(INDEX)
+        self.authorized_user.get(INDEX)
+        self.assertEqual(fragment_stats(), {'hits': 1, 'misses': 1})
+        cases = (
+            (self.post, 'text', 'Измененный пост'),
+            (self.group, 'title', 'Переименованная группа'),
+            (self.user, 'first_name', 'Новое имя'),
+        )
+        for obj, field, value in cases:
+            with self.subTest(field=field):
+                setattr(obj, field, value)
+                obj.save()
+                self.assertContains(self.authorized_user.get(INDEX), value)
+
+    def test_search_finds_ranked_posts(self):
+        """Поиск находит посты по словам текста с учетом фильтров
+        и следит за изменениями постов."""
+        other = Post.objects.create(
+            author=self.user_2,
+            group=self.another_group,
+            text='Про котов и снова про котов',
+        )
+        Post.objects.bulk_create([
+            Post(author=self.user_2, text='Массовый пост про котов')
+        ])
+        bulk = Post.objects.get(text__startswith='Массовый')
+        cases = (
+            ({'q': 'котов'}, [other, bulk]),
+            ({'q': 'КОТОВ', 'group': TEST_SLUG_2}, [other]),
+            ({'q': 'котов', 'author': TEST_NAME}, []),
+            ({'q': 'тестовый'}, [self.post]),
+            ({'q': '"*('}, []),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                response = self.client.get(SEARCH, params)
+                self.assertEqual(
+                    list(response.context['page_obj'] or []), expected
+                )
+        other.text = 'Теперь про собак'
+        other.save()
+        bulk.delete()
+        response = self.client.get(SEARCH, {'q': 'котов'})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_admin_search_reports_capped_results(self):
+        """Поиск в админке предупреждает, что результаты обрезаны."""
+        Post.objects.create(author=self.user_2, text='Второй тестовый пост')
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        changelist = reverse('admin:posts_post_changelist')
+        with mock.patch('posts.admin.ADMIN_SEARCH_LIMIT', 1):
+            response = client.get(changelist, {'q': 'тестовый'})
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        self.assertContains(response, 'Показаны только 1')
+        response = client.get(changelist, {'q': 'тестовый'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        self.assertNotContains(response, 'Показаны только')
+
+    def test_rebuild_search_index_command(self):
+        """Команда rebuild_search_index заново наполняет индекс."""
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=1, stdout=out)
+        self.assertIn('Проиндексировано постов: 1', out.getvalue())
+        response = self.client.get(SEARCH, {'q': 'пост'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_post_detail_query_count_is_constant(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_user.get(self.POST_DETAIL)
+            return len(queries)
+
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        few = count_queries()
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user_2, text=str(i))
+            for i in range(AMOUNT_OF_COMMENTS * 2)
+        )
+        self.assertEqual(count_queries(), few)
+
+    def test_load_more_comments(self):
+        """Кнопка «Показать еще» отдает следующую пачку комментариев."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Комментарий {i}')
+            for i in range(AMOUNT_OF_COMMENTS + 1)
+        )
+        comments = self.authorized_user.get(
+            self.POST_DETAIL
+        ).context['comments']
+        self.assertEqual(len(comments), AMOUNT_OF_COMMENTS)
+        response = self.authorized_user.get(
+            reverse('posts:post_comments', args=[self.post.id]),
+            {'cursor': comments.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий 0']
+        )
+
+    def test_warm_thumbnails_command(self):
+        """Команда warm_thumbnails нарезает миниатюры заранее."""
+        source = ImageFile(self.post.image)
+        default.kvstore.delete_thumbnails(source)
+        out = StringIO()
+        call_command('warm_thumbnails', workers=1, stdout=out)
+        self.assertIn('Обработано картинок: 1', out.getvalue())
+        with mock.patch.object(default.engine, 'get_image') as get_image:
+            get_thumbnail(self.post.image, '960x339', crop='center',
+                          upscale=True)
+        get_image.assert_not_called()
+
+    def test_benchmark_command(self):
+        """Команда benchmark сохраняет замеры страниц в JSON."""
+        output = os.path.join(tempfile.mkdtemp(), 'benchmark.json')
+        call_command(
+            'benchmark', iterations=3, warmup=0, output=output,
+            username=self.user_2.username, stdout=StringIO(),
+        )
+        stdout = StringIO()
+        call_command(
+            'benchmark', iterations=3, warmup=0, compare=output,
+            stdout=stdout,
+        )
+        self.assertIn('index: p50_ms', stdout.getvalue())
+        with open(output, encoding='utf-8') as report:
+            views = json.load(report)['views']
+        shutil.rmtree(os.path.dirname(output))
+        self.assertEqual(set(views), {
+            'index', 'group_posts', 'profile', 'post_detail', 'follow_index'
+        })
+        for result in views.values():
+            self.assertEqual(result['status'], 200)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        # Анонимные страницы отдаются из кэша, ленты читателя - нет.
+        self.assertEqual(views['index']['queries'], 0)
+        self.assertGreater(views['follow_index']['queries'], 0)
+
+    def test_conditional_get_returns_not_modified(self):
+        """Неизменившаяся страница отдается как 304 без запросов к ленте."""
+        response = self.client.get(INDEX)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.client.get(INDEX, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, NOT_MODIFIED)
+        response = self.client.get(
+            INDEX, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, NOT_MODIFIED)
+        Post.objects.create(author=self.user_2, text='Новый пост')
+        response = self.client.get(INDEX, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, OK)
+
+    def test_conditional_get_tracks_changes_and_viewer(self):
+        """ETag меняется вместе с содержимым страницы и зрителем."""
+        pages = (GROUP_LIST, PROFILE, self.POST_DETAIL)
+        etags = {page: self.client.get(page)['ETag'] for page in pages}
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.authorized_user.get(
+                    page, HTTP_IF_NONE_MATCH=etags[page]
+                )
+                self.assertEqual(response.status_code, OK)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        post.save()
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.client.get(
+                    page, HTTP_IF_NONE_MATCH=etags[page]
+                )
+                self.assertEqual(response.status_code, OK)
+        etag = self.client.get(PROFILE)['ETag']
+        self.authorized_user_2.get(UNFOLLOW_USER)
+        response = self.client.get(PROFILE, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, OK)
+
+    def test_profile_export_streams_archive(self):
+        """Выгрузка профиля отдает ZIP с постами, комментариями и картинкой."""
+        Comment.objects.create(post=self.post, author=self.user_2, text='Да')
+        response = self.authorized_user.get(PROFILE_EXPORT)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        posts = [
+            json.loads(line)
+            for line in archive.read('posts.jsonl').decode().splitlines()
+        ]
+        self.assertEqual(posts[0]['id'], self.post.pk)
+        self.assertEqual(posts[0]['group'], TEST_SLUG)
+        self.assertEqual(
+            json.loads(archive.read('comments.jsonl'))['author'], TEST_NAME_2
+        )
+        self.assertEqual(
+            archive.read(f'images/{self.post.image.name}'),
+            self.post.image.read(),
+        )
+
+    def test_group_export_ndjson(self):
+        """Сотрудник выгружает группу в NDJSON, команда пишет тот же поток."""
+        self.user_2.is_staff = True
+        self.user_2.save()
+        response = self.authorized_user_2.get(
+            GROUP_EXPORT, {'format': 'ndjson'}
+        )
+        content = b''.join(response.streaming_content)
+        types = [json.loads(line)['type'] for line in content.splitlines()]
+        self.assertEqual(types, ['group', 'post'])
+        output = os.path.join(tempfile.mkdtemp(), 'group.ndjson')
+        call_command(
+            'export_data', '--group', TEST_SLUG, format='ndjson',
+            output=output, stdout=StringIO(),
+        )
+        with open(output, 'rb') as exported:
+            self.assertEqual(exported.read(), content)
+        shutil.rmtree(os.path.dirname(output))
+
+    def test_feeds_are_cached_and_conditional(self):
+        """Ленты кэшируются, отдают 304 и обновляются с новым постом."""
+        response = self.client.get(GROUP_ATOM)
+        self.assertEqual(
+            response['Content-Type'], 'application/atom+xml; charset=utf-8'
+        )
+        self.assertIn('Тестовый пост', response.content.decode())
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.client.get(GROUP_ATOM).content, response.content
+            )
+        response = self.client.get(INDEX_RSS)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(INDEX_RSS, HTTP_IF_NONE_MATCH=etag).status_code,
+            NOT_MODIFIED,
+        )
+        Post.objects.create(
+            author=self.user_2, group=self.group, text='Свежий пост'
+        )
+        response = self.client.get(INDEX_RSS, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, OK)
+        self.assertIn('Свежий пост', response.content.decode())
+        response = self.client.get(GROUP_ATOM)
+        self.assertIn('Свежий пост', response.content.decode())
+
+    def test_author_lookup_is_cached(self):
+        """Автор и отсутствие пользователя кэшируются до сохранения."""
+        missing = reverse('posts:profile', args=('ghost',))
+        self.assertEqual(self.client.get(missing).status_code, NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.client.get(missing).status_code, NOT_FOUND
+            )
+        ghost = User.objects.create_user(username='ghost')
+        self.assertEqual(self.client.get(missing).status_code, OK)
+        ghost.username = 'spirit'
+        ghost.save()
+        self.assertEqual(self.client.get(missing).status_code, NOT_FOUND)
+        spirit = reverse('posts:profile', args=('spirit',))
+        self.assertEqual(self.client.get(spirit).status_code, OK)
+        ghost.delete()
+        self.assertEqual(self.client.get(spirit).status_code, NOT_FOUND)
+
+    def test_anonymous_page_cache(self):
+        """Аноним получает страницу из кэша до изменения ее области."""
+        self.client.get(PROFILE)
+        # Автор страницы тоже берется из кэша.
+        with self.assertNumQueries(0):
+            cached = self.client.get(PROFILE)
+        self.assertIn('Тестовый пост', cached.content.decode())
+        self.assertEqual(
+            self.client.get(PROFILE, {'page': 1}).context['page_obj'].number,
+            1,
+        )
+        self.client.get(GROUP_LIST_2)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        for client in (self.client, self.authorized_user):
+            self.assertIn('Правка', client.get(PROFILE).content.decode())
+        with self.assertNumQueries(1):
+            self.client.get(GROUP_LIST_2)
+        self.client.get(self.POST_DETAIL)
+        self.assertIsNone(self.client.get(self.POST_DETAIL).context)
+        Comment.objects.create(post=self.post, author=self.user_2, text='!')
+        self.assertIsNotNone(self.client.get(self.POST_DETAIL).context)
+
+    def test_user_changes_touch_only_shown_names(self):
+        """Регистрация и смена пароля не сбрасывают кэш страниц,
+        смена имени сбрасывает только страницы автора."""
+        with mock.patch('posts.receivers.touch') as touch:
+            reader = User.objects.create_user(username='newbie')
+            reader.set_password('secret')
+            reader.is_staff = True
+            reader.save()
+            touch.assert_not_called()
+            reader.first_name = 'Новичок'
+            reader.save()
+        touch.assert_called_once_with(('author', reader.pk))
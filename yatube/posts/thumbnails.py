@@ -0,0 +1,31 @@
+"""Заблаговременная нарезка миниатюр для Post.image.
+
+Шаблоны вызывают {% thumbnail %} с теми же параметрами, что перечислены
+в THUMBNAIL_VARIANTS, поэтому после нарезки sorl находит готовую
+миниатюру в key-value хранилище и не трогает исходник. Нарезка после
+сохранения поста выполняется фоновой задачей, см. core.jobs.
+"""
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.jobs import enqueue, job
+
+from .constants import THUMBNAIL_VARIANTS
+from .models import Post
+
+
+@job
+def generate(image_name):
+    # Хранилище указывается явно: от него зависит ключ миниатюры,
+    # и он должен совпасть с ключом для post.image в шаблонах.
+    source = ImageFile(image_name, Post._meta.get_field('image').storage)
+    for geometry, options in THUMBNAIL_VARIANTS:
+        get_thumbnail(source, geometry, **options)
+    return image_name
+
+
+def schedule(post):
+    if not post.image:
+        return
+    image_name = post.image.name
+    enqueue(generate, image_name, key=f'thumbnails:{image_name}')
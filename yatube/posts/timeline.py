@@ -0,0 +1,162 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается в TimelineEntry всех подписчиков автора,
+поэтому follow_index читает ленту одним проходом по индексу
+(user, pub_date, post). Авторы с очень большим числом подписчиков
+в ленты не раскладываются: их посты подмешиваются при чтении.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .constants import (
+    FANOUT_BATCH_SIZE,
+    FANOUT_LIMIT,
+    FEED_SIZE,
+    PULL_AUTHORS_CACHE_KEY,
+    PULL_AUTHORS_TIMEOUT,
+    TIMELINE_BACKFILL,
+)
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def _load_pull_author_ids():
+    return set(
+        AuthorStats.objects
+        .filter(followers__gt=FANOUT_LIMIT)
+        .values_list('user_id', flat=True)
+    )
+
+
+def pull_author_ids():
+    return cache.get_or_set(
+        PULL_AUTHORS_CACHE_KEY, _load_pull_author_ids, PULL_AUTHORS_TIMEOUT
+    )
+
+
+def _entries(user_ids, posts):
+    for user_id in user_ids:
+        for post_id, author_id, pub_date in posts:
+            yield TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+
+
+def _insert(user_ids, posts):
+    TimelineEntry.objects.bulk_create(
+        _entries(user_ids, posts),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    if post.author_id in pull_author_ids():
+        return
+    followers = (
+        Follow.objects
+        .filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    _insert(followers, [(post.pk, post.author_id, post.pub_date)])
+
+
+def fan_out_many(posts):
+    """fan_out для пачки сохраненных постов одним проходом по авторам."""
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.author_id].append(
+            (post.pk, post.author_id, post.pub_date)
+        )
+    for author_id in set(by_author) - pull_author_ids():
+        followers = list(
+            Follow.objects
+            .filter(author_id=author_id)
+            .values_list('user_id', flat=True)
+        )
+        if followers:
+            _insert(followers, by_author[author_id])
+
+
+def _latest_posts(author_id, limit=TIMELINE_BACKFILL):
+    return list(
+        Post.objects
+        .filter(author_id=author_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'author_id', 'pub_date')[:limit]
+    )
+
+
+def backfill(user_id, author_id):
+    if author_id in pull_author_ids():
+        return
+    _insert([user_id], _latest_posts(author_id))
+
+
+def backfill_authors(author_ids):
+    pull_authors = pull_author_ids()
+    for author_id in set(author_ids) - pull_authors:
+        followers = list(
+            Follow.objects
+            .filter(author_id=author_id)
+            .values_list('user_id', flat=True)
+        )
+        if followers:
+            _insert(followers, _latest_posts(author_id))
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def refresh_pull_authors(author_id, unfollowed=False):
+    followers = (
+        AuthorStats.objects
+        .filter(user_id=author_id)
+        .values_list('followers', flat=True)
+        .first()
+    ) or 0
+    pulled = author_id in pull_author_ids()
+    if (followers > FANOUT_LIMIT) != pulled:
+        cache.delete(PULL_AUTHORS_CACHE_KEY)
+    # Отметка в кэше могла устареть, поэтому переход из pull в push
+    # узнается и по отписке, опустившей счетчик до FANOUT_LIMIT.
+    if followers <= FANOUT_LIMIT and (
+        pulled or unfollowed and followers == FANOUT_LIMIT
+    ):
+        _backfill_pulled(author_id)
+
+
+def _backfill_pulled(author_id):
+    """Раскладывает посты, вышедшие, пока автор был в режиме pull."""
+    followers = list(
+        Follow.objects
+        .filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+    if followers:
+        _insert(followers, _latest_posts(author_id, FEED_SIZE))
+
+
+def feed(user):
+    """Возвращает посты ленты подписок и поле даты для пагинации."""
+    pull_authors = list(
+        Follow.objects
+        .filter(user=user, author_id__in=pull_author_ids())
+        .values_list('author_id', flat=True)
+    )
+    if pull_authors:
+        posts = Post.objects.filter(
+            Q(timeline_entries__user=user) | Q(author_id__in=pull_authors)
+        ).distinct()
+        return posts.select_related('author', 'group'), 'pub_date'
+    posts = (
+        Post.objects
+        .filter(timeline_entries__user=user)
+        .annotate(feed_date=F('timeline_entries__pub_date'))
+    )
+    return posts.select_related('author', 'group'), 'feed_date'
@@ -0,0 +1,138 @@
+"""Лента «Обсуждаемое»: посты с недавними комментариями.
+
+Каждый комментарий увеличивает счетчик PostActivity своего поста
+за текущий час, удаление комментария уменьшает его. После изменения
+счетчиков в конце интервала TRENDING_INTERVAL фоновая задача recompute
+складывает счетчики за TRENDING_WINDOW_HOURS с затуханием вдвое
+за TRENDING_HALF_LIFE_HOURS и записывает первые TRENDING_SIZE постов
+в TrendingPost. Пока рейтинг не пуст, recompute ставит себя на следующий
+интервал: со временем оценки затухают, а старые часы выходят из окна,
+даже если новых комментариев нет. Страница читает готовый рейтинг
+по первичному ключу rank и не агрегирует комментарии.
+"""
+import heapq
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from operator import itemgetter
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+
+from core.jobs import enqueue, job
+
+from .conditional import TRENDING, touch
+from .constants import (
+    TRENDING_HALF_LIFE_HOURS,
+    TRENDING_INTERVAL,
+    TRENDING_SIZE,
+    TRENDING_WINDOW_HOURS,
+)
+from .models import Comment, PostActivity, TrendingPost
+
+
+def hour_of(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now):
+    return hour_of(now) - timedelta(hours=TRENDING_WINDOW_HOURS)
+
+
+def schedule():
+    now = time.time()
+    slot = int(now // TRENDING_INTERVAL)
+    # Задача на интервал ставится один раз, без запроса на каждый
+    # комментарий; при потере ключа дубликат отсечет очередь.
+    if not cache.add(f'trending:slot:{slot}', True, TRENDING_INTERVAL):
+        return
+    enqueue(
+        recompute,
+        key=f'trending:{slot}',
+        delay=(slot + 1) * TRENDING_INTERVAL - now,
+    )
+
+
+def record(comments):
+    """Учитывает комментарии в почасовых счетчиках постов."""
+    since = window_start(timezone.now())
+    buckets = Counter(
+        (comment.post_id, hour_of(comment.created)) for comment in comments
+        if comment.created >= since
+    )
+    for (post_id, hour), total in buckets.items():
+        bucket = PostActivity.objects.filter(post_id=post_id, hour=hour)
+        if bucket.update(comments=F('comments') + total):
+            continue
+        try:
+            with transaction.atomic():
+                PostActivity.objects.create(
+                    post_id=post_id, hour=hour, comments=total
+                )
+        except IntegrityError:
+            bucket.update(comments=F('comments') + total)
+    if buckets:
+        schedule()
+
+
+def forget(comment):
+    if PostActivity.objects.filter(
+        post_id=comment.post_id, hour=hour_of(comment.created)
+    ).update(comments=Greatest(F('comments') - 1, Value(0))):
+        schedule()
+
+
+def score(buckets, now):
+    """Сумма комментариев по часам с экспоненциальным затуханием."""
+    scores = defaultdict(float)
+    for post_id, hour, comments in buckets:
+        age = (now - hour).total_seconds() / 3600
+        scores[post_id] += comments * 0.5 ** (age / TRENDING_HALF_LIFE_HOURS)
+    return scores
+
+
+@job
+def recompute():
+    now = timezone.now()
+    PostActivity.objects.filter(hour__lt=window_start(now)).delete()
+    scores = score(
+        PostActivity.objects
+        .filter(comments__gt=0)
+        .values_list('post_id', 'hour', 'comments')
+        .iterator(),
+        now,
+    )
+    top = heapq.nlargest(TRENDING_SIZE, scores.items(), key=itemgetter(1))
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(rank=rank, post_id=post_id, score=value)
+            for rank, (post_id, value) in enumerate(top, start=1)
+        )
+    touch(TRENDING)
+    if top:
+        schedule()
+    return len(top)
+
+
+def backfill():
+    """Заново собирает почасовые счетчики из комментариев за окно."""
+    since = window_start(timezone.now())
+    rows = (
+        Comment.objects
+        .filter(created__gte=since)
+        .order_by()
+        .annotate(hour=TruncHour('created'))
+        .values('post_id', 'hour')
+        .annotate(total=Count('pk'))
+        .values_list('post_id', 'hour', 'total')
+    )
+    with transaction.atomic():
+        PostActivity.objects.all().delete()
+        PostActivity.objects.bulk_create(
+            PostActivity(post_id=post_id, hour=hour, comments=total)
+            for post_id, hour, total in rows.iterator()
+        )
@@ -1,16 +1,64 @@
 from django.urls import path
 
 from . import views
+from .feeds import (
+    AuthorAtomFeed,
+    AuthorFeed,
+    GroupAtomFeed,
+    GroupFeed,
+    IndexAtomFeed,
+    IndexFeed,
+    feed_view,
+)
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
+    path('rss/', feed_view(IndexFeed), name='index_rss'),
+    path('atom/', feed_view(IndexAtomFeed), name='index_atom'),
+    path(
+        'group/<slug:slug>/rss/',
+        feed_view(GroupFeed),
+        name='group_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feed_view(GroupAtomFeed),
+        name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        feed_view(AuthorFeed),
+        name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feed_view(AuthorAtomFeed),
+        name='profile_atom'
+    ),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/export/',
+        views.group_export,
+        name='group_export'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/export/',
+        views.profile_export,
+        name='profile_export'
+    ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
@@ -27,4 +75,14 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'profile/<str:username>/notify/',
+        views.profile_notify,
+        name='profile_notify'
+    ),
+    path(
+        'profile/<str:username>/mute/',
+        views.profile_mute,
+        name='profile_mute'
+    ),
 ]
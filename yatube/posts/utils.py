@@ -1,10 +1,192 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from itertools import islice
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .constants import (
+    AMOUNT_OF_COMMENTS,
+    AMOUNT_OF_PUBLICATIONS,
+    CURSOR_PARAM,
+    PAGE_PARAM,
+    PAGE_WINDOW,
+)
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, value, pk):
+    raw = f'{direction}|{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (направление, дата, pk) или None для битого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, value, pk = raw.decode().split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        return None
+    return direction, value, pk
+
+
+class CursorPage(Sequence):
+    """Страница ленты без COUNT(*) и OFFSET.
+
+    Повторяет интерфейс django.core.paginator.Page, который нужен
+    шаблонам, но вместо номеров страниц отдает курсоры соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
 
-from .constants import AMOUNT_OF_PUBLICATIONS
 
+class CursorPaginator:
+    """Keyset-пагинация по паре (date_field, id) в порядке убывания."""
 
-def paginator_posts(post_list, request):
-    paginator = Paginator(post_list, AMOUNT_OF_PUBLICATIONS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.date_field = date_field
+
+    def _key(self, obj, direction):
+        return encode_cursor(direction, getattr(obj, self.date_field), obj.pk)
+
+    def get_page(self, token=None):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._first_page()
+        direction, value, pk = cursor
+        if direction == NEXT:
+            return self._page_after(value, pk)
+        return self._page_before(value, pk)
+
+    def _slice(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+    def _first_page(self):
+        objects = self._slice(
+            self.object_list.order_by(f'-{self.date_field}', '-pk')
+        )
+        return self._build(objects, has_more=True, has_previous=False)
+
+    def _page_after(self, value, pk):
+        field = self.date_field
+        objects = self._slice(
+            self.object_list
+            .filter(
+                Q(**{f'{field}__lt': value})
+                | Q(**{field: value, 'pk__lt': pk})
+            )
+            .order_by(f'-{field}', '-pk')
+        )
+        return self._build(objects, has_more=True, has_previous=True)
+
+    def _page_before(self, value, pk):
+        field = self.date_field
+        objects = self._slice(
+            self.object_list
+            .filter(
+                Q(**{f'{field}__gt': value})
+                | Q(**{field: value, 'pk__gt': pk})
+            )
+            .order_by(field, 'pk')
+        )
+        has_previous = len(objects) > self.per_page
+        objects = objects[:self.per_page][::-1]
+        if not objects:
+            return self._first_page()
+        return CursorPage(
+            objects,
+            next_cursor=self._key(objects[-1], NEXT),
+            previous_cursor=(
+                self._key(objects[0], PREVIOUS) if has_previous else None
+            ),
+        )
+
+    def _build(self, objects, has_more, has_previous):
+        has_next = has_more and len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if not objects:
+            return CursorPage(objects)
+        return CursorPage(
+            objects,
+            next_cursor=self._key(objects[-1], NEXT) if has_next else None,
+            previous_cursor=(
+                self._key(objects[0], PREVIOUS) if has_previous else None
+            ),
+        )
+
+
+def page_window(page_obj, size=PAGE_WINDOW):
+    first = max(page_obj.number - size, 1)
+    last = min(page_obj.number + size, page_obj.paginator.num_pages)
+    return range(first, last + 1)
+
+
+def numbered_page(object_list, request, per_page=AMOUNT_OF_PUBLICATIONS):
+    paginator = Paginator(object_list, per_page)
+    page_obj = paginator.get_page(request.GET.get(PAGE_PARAM))
+    page_obj.is_cursor = False
+    page_obj.page_window = page_window(page_obj)
     return page_obj
+
+
+def paginator_posts(post_list, request, per_page=AMOUNT_OF_PUBLICATIONS,
+                    date_field='pub_date'):
+    if request.GET.get(PAGE_PARAM) is None:
+        return CursorPaginator(post_list, per_page, date_field).get_page(
+            request.GET.get(CURSOR_PARAM)
+        )
+    return numbered_page(
+        post_list.order_by(f'-{date_field}', '-pk'), request, per_page
+    )
+
+
+def paginate_comments(post, request):
+    if not request.user.is_authenticated:
+        return None
+    return paginator_posts(
+        post.comments.select_related('author'),
+        request,
+        per_page=AMOUNT_OF_COMMENTS,
+        date_field='created',
+    )
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -1,12 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.db import transaction
+from django.http import StreamingHttpResponse
 
-from .models import Post, Group, User, Follow
-from .forms import PostForm, CommentForm
-from .utils import paginator_posts
+from . import export, thumbnails, timeline
+from .authors import get_author_or_404
+from .conditional import (
+    anonymous_page_cache,
+    author_scopes,
+    conditional,
+    group_scopes,
+    index_scopes,
+    touch,
+    trending_scopes,
+)
+from .constants import AMOUNT_OF_PUBLICATIONS
+from .stats import get_stats
+from .models import Post, Group, Follow
+from .forms import PostForm, CommentForm, SearchForm
+from .search import search_posts
+from .utils import numbered_page, paginate_comments, paginator_posts
 
 
+@conditional(index_scopes)
+@anonymous_page_cache(index_scopes)
 def index(request):
     post_list = (
         Post.objects
@@ -18,9 +35,27 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional(trending_scopes)
+@anonymous_page_cache(trending_scopes)
+def trending(request):
+    # Рейтинг не длиннее TRENDING_SIZE, страницы берутся по rank.
+    post_list = (
+        Post.objects
+        .filter(trend__isnull=False)
+        .select_related('author', 'group')
+        .order_by('trend__rank')
+    )
+    context = {
+        'page_obj': numbered_page(post_list, request),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@conditional(group_scopes)
+@anonymous_page_cache(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    posts = group.group_posts.select_related('author')
     context = {
         'group': group,
         'posts': posts,
@@ -29,36 +64,111 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional(author_scopes)
+@anonymous_page_cache(author_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    following = (
-        request.user.is_authenticated
-        and request.user != author
-        and Follow.objects.filter(
+    author = get_author_or_404(username)
+    posts = Post.objects.filter(author=author).select_related('group')
+    follow = None
+    if request.user.is_authenticated and request.user != author:
+        follow = Follow.objects.filter(
             author=author,
-            user=request.user).exists()
-    )
+            user=request.user).first()
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': paginator_posts(posts, request),
-        'following': following,
+        'following': follow is not None,
+        'notify': follow is not None and follow.notify,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def export_response(request, filename, **scope):
+    if request.GET.get('format') == 'ndjson':
+        response = StreamingHttpResponse(
+            export.ndjson(**scope), content_type='application/x-ndjson'
+        )
+        filename += '.ndjson'
+    else:
+        response = StreamingHttpResponse(
+            export.archive(**scope), content_type='application/zip'
+        )
+        filename += '.zip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def profile_export(request, username):
+    author = get_author_or_404(username)
+    if request.user != author and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    return export_response(request, author.username, author=author)
+
+
+@login_required
+def group_export(request, slug):
+    if not request.user.is_staff:
+        return redirect('posts:group_list', slug=slug)
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(request, group.slug, group=group)
+
+
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    query = request.GET.copy()
+    query.pop('page', None)
+    if form.is_valid():
+        try:
+            number = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            number = 1
+        page_obj = search_posts(
+            form.cleaned_data['q'],
+            AMOUNT_OF_PUBLICATIONS,
+            number=number,
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+        )
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'query': query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def post_scopes(request, post_id):
+    return [('post', post_id)]
+
+
+@conditional(post_scopes)
+@anonymous_page_cache(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author = get_object_or_404(User, posts__pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
     context = {
-        'author': author,
+        'author': post.author,
         'post': post,
         'form': CommentForm(),
-        'comments': post.comments.all(),
+        'comments': paginate_comments(post, request),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@login_required
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': paginate_comments(post, request),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     post = Post(author=request.user)
@@ -69,7 +179,8 @@ def post_create(request):
     )
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                thumbnails.schedule(form.save())
             return redirect('posts:profile', request.user.username)
     context = {
         'form': form,
@@ -88,7 +199,10 @@ def post_edit(request, post_id):
         instance=edit_post
     )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            post = form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -112,9 +226,9 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list, date_field = timeline.feed(request.user)
     context = {
-        'page_obj': paginator_posts(post_list, request),
+        'page_obj': paginator_posts(post_list, request, date_field=date_field),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -122,14 +236,34 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     if request.user.username != username:
-        author = get_object_or_404(User, username=username)
+        author = get_author_or_404(username)
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     if Follow.objects.filter(user=request.user, author=author).exists():
         Follow.objects.get(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+def set_notify(request, username, notify):
+    author = get_author_or_404(username)
+    if Follow.objects.filter(user=request.user, author=author).update(
+        notify=notify
+    ):
+        # Кнопка уведомлений на странице автора должна смениться.
+        touch(('author', author.pk))
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_notify(request, username):
+    return set_notify(request, username, True)
+
+
+@login_required
+def profile_mute(request, username):
+    return set_notify(request, username, False)
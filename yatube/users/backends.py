@@ -0,0 +1,27 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT = 60 * 60
+
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берет пользователя сессии из кэша.
+
+    Запись сбрасывается сигналами при любом сохранении пользователя,
+    в том числе при смене пароля, поэтому хэш сессии сверяется
+    с актуальным паролем.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+User = get_user_model()
+ABOUT = reverse('about:author')
+
+
+class CachedAuthTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='reader', password='old-password'
+        )
+        self.client = Client()
+        self.client.login(username='reader', password='old-password')
+
+    def test_session_and_user_come_from_cache(self):
+        """Страница залогиненного пользователя не читает сессию и юзера."""
+        self.client.get(ABOUT)
+        with self.assertNumQueries(0):
+            response = self.client.get(ABOUT)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_cached_user_is_refreshed_after_profile_change(self):
+        self.client.get(ABOUT)
+        self.user.first_name = 'Читатель'
+        self.user.save()
+        response = self.client.get(ABOUT)
+        self.assertEqual(response.context['user'].first_name, 'Читатель')
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get(ABOUT)
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(ABOUT)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_sessions_of_plain_model_backend_stay_logged_in(self):
+        """Сессии, открытые до кэширующего бэкенда, не сбрасываются."""
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        response = client.get(ABOUT)
+        self.assertEqual(response.context['user'], self.user)
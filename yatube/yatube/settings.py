@@ -1,11 +1,28 @@
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-SECRET_KEY = '%@!c9t@gjwp2h8yc0b^a40+b*1nbo&i8r5+or#h+c01jzk-c)8'
+# Профиль настроек: dev (по умолчанию) или production, в котором нет
+# debug_toolbar, шаблоны кэшируются, а соединения с базой переиспользуются.
+PROFILE = os.environ.get('YATUBE_PROFILE', 'dev')
+if PROFILE not in ('dev', 'production'):
+    raise ImproperlyConfigured(f'Неизвестный YATUBE_PROFILE: {PROFILE}')
+PRODUCTION = PROFILE == 'production'
+
+# Ключ из репозитория годится только для разработки: им подписаны
+# сессии и CSRF-токены.
+SECRET_KEY = os.environ.get('YATUBE_SECRET_KEY')
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise ImproperlyConfigured(
+            'Для YATUBE_PROFILE=production нужен YATUBE_SECRET_KEY'
+        )
+    SECRET_KEY = '%@!c9t@gjwp2h8yc0b^a40+b*1nbo&i8r5+or#h+c01jzk-c)8'
 
-DEBUG = True
+DEBUG = not PRODUCTION
 
 ALLOWED_HOSTS =[
     'localhost',
@@ -31,11 +48,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.replicas.ReplicaMiddleware',
+    'core.queries.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiler.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -72,9 +93,73 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Локально реплика - тот же файл, то есть чтение идет с default,
+    # или копия из sync_replica по пути YATUBE_REPLICA_PATH.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'YATUBE_REPLICA_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_PIN_SECONDS = 5
+
+# PRAGMA для каждого нового соединения SQLite, см. core.receivers.
+SQLITE_PRAGMAS = {}
+
+# Наибольшее число SQL-запросов на страницу, см. core.queries. Бюджет
+# считается для холодного кэша: сессия, пользователь и счетчики автора
+# читаются из базы.
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:profile': 9,
+    'posts:post_detail': 4,
+    'posts:post_comments': 3,
+    'posts:follow_index': 4,
+    'posts:search': 4,
+    'posts:trending': 4,
+    'posts:index_rss': 1,
+    'posts:index_atom': 1,
+    'posts:group_rss': 3,
+    'posts:group_atom': 3,
+    'posts:profile_rss': 2,
+    'posts:profile_atom': 2,
+    'posts:post_create': 13,
+    'posts:post_edit': 13,
+    'posts:add_comment': 7,
+    'posts:profile_follow': 14,
+    'posts:profile_unfollow': 13,
+    'posts:profile_notify': 3,
+    'posts:profile_mute': 3,
+}
+# Включается тестовым раннером, превышение бюджета роняет тест.
+QUERY_BUDGETS_ENFORCED = False
+
+TEST_RUNNER = 'core.queries.QueryBudgetRunner'
+
+# Доля запросов, профилируемых случайно, см. core.profiler.
+PROFILER_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_PROFILER_SAMPLE_RATE', 0)
+)
+
+
+# Пользователь сессии берется из кэша, сессии читаются из кэша
+# и записываются в базу сквозной записью. ModelBackend остается вторым:
+# в сессиях, открытых до перехода на кэш, записан его путь, и без него
+# такие пользователи разлогинились бы.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -112,16 +197,75 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят фоновой задачей, см. core.mail и команду run_jobs.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Адрес сайта для ссылок в письмах, которые уходят вне запроса.
+SITE_URL = os.environ.get('YATUBE_SITE_URL', 'http://127.0.0.1:8000')
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Тестовый раннер core.queries.QueryBudgetRunner переносит кэш
+# во временный каталог.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_SIZE': 64 * 1024 * 1024,
+            'MAX_ENTRIES': 100000,
+            'STALE_TTL': 60,
+        },
     }
 }
+
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR', os.path.join(BASE_DIR, 'metrics')
+)
+METRICS_FLUSH_INTERVAL = 5
+# /metrics доступен персоналу, адресам из списка (за прокси это адрес
+# прокси) и по заголовку Authorization: Bearer <YATUBE_METRICS_TOKEN>.
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.environ.get(
+        'YATUBE_METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+    ).split(',') if ip
+]
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
+if PRODUCTION:
+    INSTALLED_APPS.remove('debug_toolbar')
+    MIDDLEWARE.remove('debug_toolbar.middleware.DebugToolbarMiddleware')
+    MIDDLEWARE.remove('core.queries.QueryInspectorMiddleware')
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove(
+        'django.template.context_processors.debug'
+    )
+    # Шаблоны и {% include %} читаются с диска один раз на процесс.
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = int(
+            os.environ.get('YATUBE_CONN_MAX_AGE', 60)
+        )
+    # WAL не блокирует чтение на время записи, busy_timeout заставляет
+    # писателей ждать блокировку вместо ошибки database is locked.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+    }
+    ALLOWED_HOSTS += [
+        host for host in os.environ.get('YATUBE_ALLOWED_HOSTS', '').split(',')
+        if host
+    ]